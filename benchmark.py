@@ -0,0 +1,255 @@
+import argparse
+import json
+import platform
+import random
+import resource
+import string
+import time
+from datetime import datetime
+
+import numpy as np
+import pytz
+
+import main
+
+# Pseudo-words padding out synthetic corpora beyond the real FAQ vocabulary
+SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'tu', 'ne', 'so', 'vi', 'pe', 'da', 'ber', 'gon', 'lix', 'mar', 'tes']
+
+# Questions outside the FAQ's domain: answering any of them is a false answer
+OFF_TOPIC_QUERIES = {
+    'en': [
+        'What is the capital of France?', 'How do I reset my wifi router?', 'What is the best way to learn guitar?',
+        'What is the weather like tomorrow?', 'How do I change a flat tyre?', 'What are the rules of cricket?',
+        'How do I open a bank account?', 'What is the price of gold today?', 'How do I bake sourdough bread?',
+        'What is the best programming language?', 'Who won the football match last night?',
+        'How do I renew my passport?', 'What time does the train to London leave?',
+        'How do I clean a leather sofa?', 'What are the symptoms of a failing car battery?',
+        'How can I prevent rust on my bike?', 'What should I plant in my garden in spring?',
+        'What is the treatment for a slow computer?', 'How do I write a cover letter?',
+        'What is the history of the Roman empire?'
+    ],
+    'es': [
+        '¿Cuál es la capital de Francia?', '¿Cómo reinicio mi router wifi?', '¿Qué tiempo hará mañana?',
+        '¿Cómo cambio una rueda pinchada?', '¿Cómo abro una cuenta bancaria?', '¿Cuál es el precio del oro hoy?',
+        '¿Cómo hago pan de masa madre?', '¿Quién ganó el partido de fútbol anoche?',
+        '¿Cómo renuevo mi pasaporte?', '¿Qué debo plantar en mi jardín en primavera?'
+    ],
+    'hi': [
+        'फ्रांस की राजधानी क्या है?', 'मैं अपना वाईफाई राउटर कैसे रीसेट करूं?', 'कल मौसम कैसा रहेगा?',
+        'मैं बैंक खाता कैसे खोलूं?', 'आज सोने की कीमत क्या है?', 'कल रात फुटबॉल मैच किसने जीता?'
+    ]
+}
+
+# Dense fusion settings tried by --dense-sweep
+DENSE_SWEEP_FLOORS = (0.5, 0.6, 0.7, 0.8)
+DENSE_SWEEP_WEIGHTS = (0.3, 0.5, 0.7)
+
+def load_labelled_queries(path):
+    """Load [{"query", "language", "question"}] where question is the expected FAQ question"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+def paraphrase(question, rng):
+    """Perturb a question the way patients rephrase it: drop, reorder or trim words"""
+    words = question.translate(str.maketrans('', '', string.punctuation + '¿¡')).split()
+    variant = rng.choice(['original', 'reordered', 'dropped', 'keywords'])
+    if variant == 'reordered':
+        rng.shuffle(words)
+    elif variant == 'dropped' and len(words) > 3:
+        for _ in range(rng.randint(1, 2)):
+            words.pop(rng.randrange(len(words)))
+    elif variant == 'keywords':
+        words = [word for word in words if len(word) > 3] or words
+    return ' '.join(words)
+
+def generate_queries(faq_items, language, count, rng):
+    """Labelled paraphrase queries drawn from a language's FAQ questions"""
+    queries = []
+    for _ in range(count):
+        label = rng.randrange(len(faq_items))
+        queries.append({
+            'query': paraphrase(faq_items[label]['question'], rng),
+            'language': language,
+            'label': label
+        })
+    return queries
+
+def synthetic_corpus(faq_items, size, rng):
+    """Scale a real FAQ corpus up to `size` entries with distinct synthetic questions"""
+    real_words = sorted({
+        word for item in faq_items
+        for word in item['question'].translate(str.maketrans('', '', string.punctuation)).split()
+        if len(word) > 2
+    })
+    pseudo_words = [a + b + c for a in SYLLABLES for b in SYLLABLES for c in SYLLABLES]
+    openers = sorted({' '.join(item['question'].split()[:2]) for item in faq_items})
+
+    items = list(faq_items)
+    while len(items) < size:
+        topic = rng.sample(real_words, 2) + rng.sample(pseudo_words, 3)
+        items.append({
+            'question': f"{rng.choice(openers)} {' '.join(topic)}?",
+            'answer': f"Synthetic answer {len(items)}."
+        })
+    return items
+
+def evaluate_queries(index, language, queries, off_topic=(), top_k=3):
+    """Time every query through the /chat search path and score the answers it would give"""
+    latencies = []
+    top1 = topk = answered_correctly = 0
+    for query in queries:
+        started = time.perf_counter()
+        analysis = main.analyze_text(query['query'], language)
+        scores = main.score_faq_matches(index, [analysis])[0]
+        result = main.best_faq_match(index, scores, top_k=top_k)
+        latencies.append(time.perf_counter() - started)
+
+        ranked = [candidate.position for candidate in result.candidates]
+        top1 += int(ranked[0] == query['label'])
+        topk += int(query['label'] in ranked)
+        answered_correctly += int(result.answer is not None and ranked[0] == query['label'])
+
+    # Off-topic queries should fall through to the fallback reply
+    false_answers = 0
+    for text in off_topic:
+        analysis = main.analyze_text(text, language)
+        scores = main.score_faq_matches(index, [analysis])[0]
+        false_answers += int(main.best_faq_match(index, scores, top_k=top_k).answer is not None)
+
+    results = {
+        'latencies': latencies,
+        'top1_accuracy': round(top1 / len(queries), 4),
+        f'top{top_k}_accuracy': round(topk / len(queries), 4),
+        'answer_accuracy': round(answered_correctly / len(queries), 4)
+    }
+    if off_topic:
+        results['off_topic_count'] = len(off_topic)
+        results['off_topic_answer_rate'] = round(false_answers / len(off_topic), 4)
+    return results
+
+def run_scenario(name, language, faq_items, queries, off_topic=(), top_k=3):
+    """Build an index for the corpus, then time every query through the /chat search path"""
+    started = time.perf_counter()
+    index = main.build_faq_index(language, faq_items)
+    build_seconds = time.perf_counter() - started
+    if index.vectorizer is None:
+        return {'name': name, 'language': language, 'faq_count': len(faq_items), 'error': 'index has no usable terms'}
+
+    evaluation = evaluate_queries(index, language, queries, off_topic, top_k)
+    latencies = evaluation.pop('latencies')
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'name': name,
+        'language': language,
+        'faq_count': len(faq_items),
+        'query_count': len(queries),
+        'build_seconds': round(build_seconds, 4),
+        'queries_per_second': round(len(queries) / sum(latencies), 2),
+        'latency_ms': {
+            'mean': round(float(latencies_ms.mean()), 3),
+            'p50': round(float(np.percentile(latencies_ms, 50)), 3),
+            'p95': round(float(np.percentile(latencies_ms, 95)), 3),
+            'p99': round(float(np.percentile(latencies_ms, 99)), 3)
+        },
+        **evaluation,
+        # Process-wide high-water mark, so run scenarios smallest first
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+
+def dense_sweep(language, faq_items, queries, off_topic):
+    """Accuracy and off-topic false answers for each dense weight and similarity floor"""
+    index = main.build_faq_index(language, faq_items)
+    if index.dense_index is None:
+        return {'language': language, 'error': 'no dense model loaded for this language (set DENSE_MODELS)'}
+
+    settings = (main.DENSE_SIMILARITY_FLOOR, main.DENSE_WEIGHT)
+    results = []
+    try:
+        for floor in DENSE_SWEEP_FLOORS:
+            for weight in DENSE_SWEEP_WEIGHTS:
+                # score_faq_matches reads the module settings on every call
+                main.DENSE_SIMILARITY_FLOOR, main.DENSE_WEIGHT = floor, weight
+                evaluation = evaluate_queries(index, language, queries, off_topic)
+                evaluation.pop('latencies')
+                results.append({'floor': floor, 'weight': weight, **evaluation})
+    finally:
+        main.DENSE_SIMILARITY_FLOOR, main.DENSE_WEIGHT = settings
+
+    # TF-IDF and keywords alone, the baseline every setting should beat
+    lexical = evaluate_queries(index._replace(dense_index=None), language, queries, off_topic)
+    lexical.pop('latencies')
+    return {
+        'language': language,
+        'dense_model': main.dense_models[language].meta.get('name'),
+        'lexical_only': lexical,
+        'settings': results
+    }
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Benchmark FAQ retrieval throughput and accuracy')
+    parser.add_argument('--queries', help='JSON file of labelled queries (default: generated paraphrases)')
+    parser.add_argument('--queries-per-language', type=int, default=200)
+    parser.add_argument('--sizes', type=int, nargs='*', default=[1000, 10000, 100000],
+                        help='synthetic corpus sizes (English)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results JSON here as well as stdout')
+    parser.add_argument('--dense-sweep', action='store_true',
+                        help='also score every DENSE_WEIGHT/DENSE_SIMILARITY_FLOOR pair for the DENSE_MODELS languages')
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    faq_by_language = main.load_faq_data()
+
+    if args.queries:
+        labelled = load_labelled_queries(args.queries)
+        questions = {
+            language: {item['question']: i for i, item in enumerate(items)}
+            for language, items in faq_by_language.items()
+        }
+        queries_by_language = {}
+        for item in labelled:
+            queries_by_language.setdefault(item['language'], []).append({
+                'query': item['query'],
+                'language': item['language'],
+                'label': questions[item['language']][item['question']]
+            })
+    else:
+        queries_by_language = {
+            language: generate_queries(items, language, args.queries_per_language, rng)
+            for language, items in faq_by_language.items() if items
+        }
+
+    scenarios = []
+    for language, queries in queries_by_language.items():
+        scenarios.append(run_scenario(
+            f'faq_{language}', language, faq_by_language[language], queries, OFF_TOPIC_QUERIES.get(language, ())
+        ))
+
+    for size in sorted(args.sizes):
+        corpus = synthetic_corpus(faq_by_language['en'], size, rng)
+        # Query the synthetic entries as well as the real ones
+        queries = generate_queries(corpus, 'en', args.queries_per_language, rng)
+        scenarios.append(run_scenario(f'synthetic_en_{size}', 'en', corpus, queries))
+
+    results = {
+        'created_at': datetime.now(pytz.utc).isoformat(),
+        'python': platform.python_version(),
+        'nlp_model': 'en_core_web_sm' if main.nlp else 'fallback',
+        'dense_retrieval': sorted(main.dense_models),
+        'seed': args.seed,
+        'scenarios': scenarios
+    }
+    if args.dense_sweep:
+        results['dense_sweep'] = [
+            dense_sweep(language, faq_by_language[language], queries_by_language[language],
+                        OFF_TOPIC_QUERIES.get(language, ()))
+            for language in sorted(main.dense_models) if language in queries_by_language
+        ]
+    output = json.dumps(results, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main_cli()
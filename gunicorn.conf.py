@@ -0,0 +1,49 @@
+# Production server: gunicorn -c gunicorn.conf.py
+#
+# The app (spaCy model and FAQ indexes) is loaded once in the master process
+# and shared copy-on-write by the forked workers. Everything is configured
+# through environment variables.
+import gc
+import glob
+import multiprocessing
+import os
+import tempfile
+
+# One process per core scales best; keep numeric libraries single-threaded
+# so workers don't oversubscribe the CPUs
+for variable in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS'):
+    os.environ.setdefault(variable, '1')
+
+wsgi_app = 'main:app'
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count()))
+# More than one thread switches to the gthread worker; the retrieval engine is
+# immutable and the shared caches are locked, so requests can run concurrently
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+preload_app = True
+
+# Workers share no memory, so with more than one: keep chat history in SQLite,
+# poll the FAQ edit log (and the files, for hand edits) so admin edits reach
+# every worker, and pool the /metrics counters through snapshot files
+if workers > 1:
+    os.environ.setdefault('CHAT_HISTORY_DB', 'chat_history.db')
+    os.environ.setdefault('FAQ_WATCH_INTERVAL', '5')
+    if 'METRICS_DIR' not in os.environ:
+        os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='chatbot-metrics-')
+
+# Keep the garbage collector from touching (and so copying) the preloaded
+# model's pages: collect nothing while loading, freeze before forking
+gc.disable()
+
+def on_starting(server):
+    # Snapshots left by a previous run would inflate the counters
+    if os.environ.get('METRICS_DIR'):
+        for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+            os.remove(path)
+
+def pre_fork(server, worker):
+    gc.freeze()
+
+def post_fork(server, worker):
+    gc.enable()
@@ -1,19 +1,45 @@
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response
 import json
 import spacy
+import sklearn
 import numpy as np
+from scipy.sparse import csr_matrix, vstack
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.metrics.pairwise import cosine_similarity
 import re
-from collections import Counter
+import math
+from collections import Counter, OrderedDict, deque, namedtuple
+from types import MappingProxyType
+from contextlib import contextmanager
+from contextvars import ContextVar
 import string
+import sqlite3
+import atexit
+import hmac
+import hashlib
+import zipfile
+import shutil
+import tempfile
+import glob
+import argparse
+import threading
+import time
 import uuid
+import secrets
 from datetime import datetime
 import os
+import sys
 import pytz
+try:
+    import fcntl
+except ImportError:  # not on Windows, where only a single server process is supported
+    fcntl = None
 
 app = Flask(__name__)
-app.secret_key = 'healthcare_chatbot_secret_key_2024'
+# Set SECRET_KEY in production; a random key only lasts as long as the server process
+app.secret_key = os.environ.get('SECRET_KEY') or secrets.token_hex(32)
+if not os.environ.get('SECRET_KEY'):
+    print("SECRET_KEY is not set; using a random key, so sessions reset on restart", file=sys.stderr)
 
 # Chatbot identity
 CHATBOT_NAME = "Dr. Alex"
@@ -23,97 +49,351 @@ CHATBOT_PERSONALITY = {
     'hi': f"नमस्ते! मैं {CHATBOT_NAME} हूं, आपका AI स्वास्थ्य सहायक।"
 }
 
-# Chat history storage (in production, use a proper database)
-chat_histories = {}
+# Replies that don't depend on the FAQ
+EMPTY_INPUT_RESPONSES = {
+    'en': f'Please ask me a question about healthcare! I\'m {CHATBOT_NAME}, here to help.',
+    'es': f'¡Por favor hazme una pregunta sobre atención médica! Soy {CHATBOT_NAME}, aquí para ayudar.',
+    'hi': f'कृपया मुझसे स्वास्थ्य के बारे में कोई प्रश्न पूछें! मैं {CHATBOT_NAME} हूं, यहाँ मदद के लिए।'
+}
+
+IDENTITY_RESPONSES = {
+    'en': f'You can call me {CHATBOT_NAME}! I\'m your AI healthcare assistant. I\'m here to help you with medical questions, health information, and general wellness guidance. Feel free to ask me anything about healthcare!',
+    'es': f'¡Puedes llamarme {CHATBOT_NAME}! Soy tu asistente de salud con IA. Estoy aquí para ayudarte con preguntas médicas, información de salud y orientación general de bienestar. ¡Siéntete libre de preguntarme cualquier cosa sobre atención médica!',
+    'hi': f'आप मुझे {CHATBOT_NAME} कह सकते हैं! मैं आपका AI स्वास्थ्य सहायक हूं। मैं यहाँ आपकी चिकित्सा प्रश्नों, स्वास्थ्य जानकारी और सामान्य कल्याण मार्गदर्शन में मदद के लिए हूं। स्वास्थ्य के बारे में मुझसे कुछ भी पूछने में संकोच न करें!'
+}
+
+# Questions answered with the chatbot's name instead of an FAQ search
+IDENTITY_QUESTIONS = frozenset([
+    'what can i call you', 'what is your name', 'who are you', '¿cómo te llamas?', '¿quién eres?',
+    'आपका नाम क्या है', 'आप कौन हैं', 'मैं आपको क्या कह सकता हूं'
+])
+
+# Chat history limits
+HISTORY_MAX_MESSAGES = 50  # per user
+HISTORY_IDLE_TIMEOUT = 24 * 60 * 60  # seconds before an inactive session is evicted
+HISTORY_MAX_SESSIONS = 100000  # in-memory backend only
+HISTORY_WRITE_BATCH = 32  # SQLite backend only
+HISTORY_FLUSH_INTERVAL = 1.0  # seconds, SQLite backend only
 
-# Load spaCy model
+# Load spaCy model (only lemmas and stop word flags are used, so skip the parser and NER)
 try:
-    nlp = spacy.load("en_core_web_sm")
+    nlp = spacy.load("en_core_web_sm", disable=["parser", "ner"])
 except OSError:
-    print("spaCy model not found. Install with: python -m spacy download en_core_web_sm")
+    print("spaCy model not found. Install with: python -m spacy download en_core_web_sm", file=sys.stderr)
     nlp = None
 
+# Optional dense (word vector) retrieval, e.g. DENSE_MODELS="en:en_core_web_md,es:es_core_news_md"
+# Calibrate the weight and floor for a model with `benchmark.py --dense-sweep`
+DENSE_WEIGHT = float(os.environ.get('DENSE_WEIGHT', 0.5))  # weight of the rescaled dense score when fused with the TF-IDF/keyword score
+DENSE_SIMILARITY_FLOOR = float(os.environ.get('DENSE_SIMILARITY_FLOOR', 0.6))  # vector cosines below this are treated as unrelated
+DENSE_IVF_MIN_SIZE = 20000  # corpora at least this large use an inverted-file index
+DENSE_IVF_PROBES = 8  # clusters searched per query in the inverted-file index
+
+def load_dense_models(spec):
+    """Load the spaCy vector models named in a "language:model" list"""
+    models = {}
+    for item in filter(None, (part.strip() for part in spec.split(','))):
+        language, _, model_name = item.partition(':')
+        try:
+            # Only the tokenizer and static vectors are needed
+            models[language] = spacy.load(model_name, exclude=["tagger", "parser", "ner", "lemmatizer", "attribute_ruler", "senter", "morphologizer", "tok2vec"])
+        except OSError:
+            print(f"Dense model '{model_name}' not found, using TF-IDF only for '{language}'", file=sys.stderr)
+    return models
+
+dense_models = load_dense_models(os.environ.get('DENSE_MODELS', ''))
+
+# FAQ data file for each supported language
+FAQ_FILES = {
+    'en': 'faq_data.json',
+    'es': 'faq_data_es.json',
+    'hi': 'faq_data_hi.json'
+}
+
 # Load FAQ data with multilingual support
-def load_faq_data():
+def load_faq_file(path):
     try:
-        with open('faq_data.json', 'r', encoding='utf-8') as f:
-            english_data = json.load(f)
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
     except FileNotFoundError:
-        english_data = []
-    
+        return []
+
+# Next unused entry id per language, kept so ids of deleted entries are never handed out again
+FAQ_ID_FILE = 'faq_ids.json'
+# Serialises admin edits to the FAQ and id files across gunicorn workers
+FAQ_LOCK_FILE = 'faq_data.lock'
+
+faq_file_lock_holder = threading.local()
+
+@contextmanager
+def faq_file_lock():
+    """Hold an exclusive lock on the FAQ files shared by every server process (reentrant)"""
+    if fcntl is None or getattr(faq_file_lock_holder, 'file', None):
+        yield
+        return
+    with open(FAQ_LOCK_FILE, 'a') as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        faq_file_lock_holder.file = lock_file
+        try:
+            yield
+        finally:
+            faq_file_lock_holder.file = None
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# Admin edits from every worker as JSON lines; the other workers replay them
+# onto their indexes instead of reloading (and refitting) the whole file
+FAQ_EDIT_LOG = 'faq_edits.jsonl'
+
+def faq_edit_log_size():
     try:
-        with open('faq_data_es.json', 'r', encoding='utf-8') as f:
-            spanish_data = json.load(f)
+        return os.path.getsize(FAQ_EDIT_LOG)
     except FileNotFoundError:
-        spanish_data = []
-    
+        return 0
+
+def load_faq_next_ids():
     try:
-        with open('faq_data_hi.json', 'r', encoding='utf-8') as f:
-            hindi_data = json.load(f)
+        with open(FAQ_ID_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
     except FileNotFoundError:
-        hindi_data = []
-    
-    return {
-        'en': english_data,
-        'es': spanish_data,
-        'hi': hindi_data
-    }
+        return {}
+
+def refresh_faq_next_ids():
+    """Merge in ids handed out by other worker processes (caller holds faq_file_lock)"""
+    for language, next_id in load_faq_next_ids().items():
+        faq_next_ids[language] = max(faq_next_ids.get(language, 0), next_id)
+
+def save_faq_next_ids():
+    with open(FAQ_ID_FILE + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(faq_next_ids, f, indent=2)
+    os.replace(FAQ_ID_FILE + '.tmp', FAQ_ID_FILE)
 
-multilingual_faq = load_faq_data()
+def assign_faq_ids(faq_items, next_id=0):
+    """Give every entry a unique id, keeping a saved id only for the first entry using it"""
+    saved_ids = [item['id'] for item in faq_items if type(item.get('id')) is int]
+    next_id = max([next_id] + [entry_id + 1 for entry_id in saved_ids])
+    seen, entries = set(), []
+    for item in faq_items:
+        entry_id = item.get('id')
+        if type(entry_id) is not int or entry_id in seen:
+            entry_id, next_id = next_id, next_id + 1
+        seen.add(entry_id)
+        entries.append({'id': entry_id, **{key: value for key, value in item.items() if key != 'id'}})
+    return entries, next_id
+
+faq_next_ids = load_faq_next_ids()
+
+def load_faq_entries(language):
+    """Load a language's FAQ file with a unique id on every entry"""
+    entries, faq_next_ids[language] = assign_faq_ids(
+        load_faq_file(FAQ_FILES[language]), faq_next_ids.get(language, 0)
+    )
+    return entries
+
+def load_faq_data():
+    return {language: load_faq_entries(language) for language in FAQ_FILES}
+
+def faq_file_mtimes():
+    """Modification time of each language's FAQ file (None if missing)"""
+    mtimes = {}
+    for language, path in FAQ_FILES.items():
+        try:
+            mtimes[language] = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            mtimes[language] = None
+    return mtimes
+
+with faq_file_lock():
+    loaded_faq_mtimes = faq_file_mtimes()
+    multilingual_faq = load_faq_data()
+    # Position in the edit log up to which each language's entries are current
+    faq_edit_log_offsets = dict.fromkeys(FAQ_FILES, faq_edit_log_size())
 faq_data = multilingual_faq['en']  # Default to English
-faq_questions = [item['question'] for item in faq_data]
-faq_answers = [item['answer'] for item in faq_data]
-
-# Initialize TF-IDF vectorizer with enhanced parameters
-vectorizer = TfidfVectorizer(
-    stop_words='english', 
-    lowercase=True,
-    ngram_range=(1, 2),  # Include bigrams for better matching
-    max_features=5000,
-    min_df=1,
-    max_df=0.95
+
+# Request metrics, exposed in Prometheus text format on /metrics
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+CONFIDENCE_BUCKETS = (10, 20, 30, 40, 50, 60, 70, 80, 90, 100)
+
+class Histogram:
+    """Labelled Prometheus-style histogram"""
+
+    def __init__(self, name, description, label_names, buckets):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, label_values, value):
+        with self._lock:
+            series = self._series.setdefault(label_values, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(label_values), list(series)] for label_values, series in self._series.items()]
+
+    def merge(self, snapshot):
+        """Add another worker's snapshot into this histogram"""
+        with self._lock:
+            for label_values, series in snapshot:
+                current = self._series.setdefault(tuple(label_values), [0] * len(self.buckets) + [0.0, 0])
+                for i, value in enumerate(series):
+                    current[i] += value
+
+    def empty_copy(self):
+        return Histogram(self.name, self.description, self.label_names, self.buckets)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for label_values, series in sorted(self._series.items()):
+                labels = ','.join(f'{name}="{value}"' for name, value in zip(self.label_names, label_values))
+                for bound, count in zip(self.buckets, series):
+                    lines.append(f'{self.name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f'{self.name}_bucket{{{labels},le="+Inf"}} {series[-1]}')
+                lines.append(f'{self.name}_sum{{{labels}}} {series[-2]}')
+                lines.append(f'{self.name}_count{{{labels}}} {series[-1]}')
+        return lines
+
+class MetricCounter:
+    """Labelled Prometheus-style counter"""
+
+    def __init__(self, name, description, label_names):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(label_values), value] for label_values, value in self._values.items()]
+
+    def merge(self, snapshot):
+        """Add another worker's snapshot into this counter"""
+        with self._lock:
+            for label_values, value in snapshot:
+                self._values[tuple(label_values)] = self._values.get(tuple(label_values), 0) + value
+
+    def empty_copy(self):
+        return MetricCounter(self.name, self.description, self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for label_values, value in sorted(self._values.items()):
+                labels = ','.join(f'{name}="{value}"' for name, value in zip(self.label_names, label_values))
+                lines.append(f'{self.name}{{{labels}}} {value}')
+        return lines
+
+request_duration = Histogram(
+    'chatbot_request_duration_seconds', 'Time to answer a /chat request',
+    ('language', 'status'), LATENCY_BUCKETS
+)
+stage_duration = Histogram(
+    'chatbot_stage_duration_seconds', 'Time spent in each stage of a /chat request',
+    ('stage', 'language', 'status'), LATENCY_BUCKETS
+)
+match_confidence = Histogram(
+    'chatbot_match_confidence', 'Confidence reported for /chat replies',
+    ('language', 'status'), CONFIDENCE_BUCKETS
 )
+chat_requests = MetricCounter(
+    'chatbot_requests_total', 'Answered /chat requests; matched / total is the match rate',
+    ('language', 'status')
+)
+
+chat_metrics = (request_duration, stage_duration, match_confidence, chat_requests)
+
+# With several worker processes, set METRICS_DIR so each worker saves snapshots
+# there and /metrics reports the sum over all of them (gunicorn.conf.py does this)
+METRICS_DIR = os.environ.get('METRICS_DIR')
+METRICS_FLUSH_INTERVAL = 1.0  # seconds
+metrics_flusher_pid = None
+
+def write_metrics_snapshot():
+    """Save this process's metrics as METRICS_DIR/<pid>.json"""
+    path = os.path.join(METRICS_DIR, f'{os.getpid()}.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({metric.name: metric.snapshot() for metric in chat_metrics}, f)
+    os.replace(path + '.tmp', path)
+
+def flush_metrics_periodically(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_metrics_snapshot()
+        except OSError as e:
+            print(f"Could not write metrics snapshot: {e}", file=sys.stderr)
+
+def start_metrics_flusher():
+    """Start the snapshot writer once per process when METRICS_DIR is set"""
+    global metrics_flusher_pid
+    if not METRICS_DIR or metrics_flusher_pid == os.getpid():
+        return
+    metrics_flusher_pid = os.getpid()
+    threading.Thread(target=flush_metrics_periodically, args=(METRICS_FLUSH_INTERVAL,), daemon=True).start()
+
+def collect_metrics():
+    """This process's metrics, or with METRICS_DIR the sum of every worker's latest snapshot"""
+    if not METRICS_DIR:
+        return chat_metrics
+    write_metrics_snapshot()
+    combined = tuple(metric.empty_copy() for metric in chat_metrics)
+    # Snapshots of exited workers are kept so the counters never go backwards
+    for path in glob.glob(os.path.join(METRICS_DIR, '*.json')):
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                snapshots = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for metric in combined:
+            metric.merge(snapshots.get(metric.name, []))
+    return combined
+
+# Per-request stage timings, collected only while a request is being measured
+stage_timings = ContextVar('stage_timings', default=None)
+
+@contextmanager
+def timed_stage(name):
+    """Add the time spent in the block to the current request's stage timings"""
+    timings = stage_timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = timings.get(name, 0.0) + time.perf_counter() - started
+
+def record_chat_metrics(reply, timings, duration):
+    """Fold one /chat request into the latency, status and confidence metrics"""
+    labels = (reply['language'], reply['status'])
+    request_duration.observe(labels, duration)
+    chat_requests.inc(labels)
+    match_confidence.observe(labels, reply['confidence'])
+    for stage, seconds in timings.items():
+        stage_duration.observe((stage,) + labels, seconds)
 
 def preprocess_text(text):
     """Enhanced text preprocessing using spaCy"""
-    if nlp:
-        doc = nlp(text.lower())
-        # Extract lemmatized tokens, excluding stop words, punctuation, and spaces
-        tokens = [
-            token.lemma_ for token in doc 
-            if not token.is_stop 
-            and not token.is_punct 
-            and not token.is_space 
-            and token.is_alpha 
-            and len(token.text) > 2
-        ]
-        return ' '.join(tokens)
-    else:
-        # Enhanced fallback preprocessing without spaCy
-        text = text.lower()
-        # Remove punctuation
-        text = text.translate(str.maketrans('', '', string.punctuation))
-        # Split and filter words
-        words = [word for word in text.split() if len(word) > 2]
-        return ' '.join(words)
-
-if faq_questions:
-    # Preprocess all FAQ questions
-    processed_questions = [preprocess_text(q) for q in faq_questions]
-    tfidf_matrix = vectorizer.fit_transform(processed_questions)
+    # Lemmatized tokens, excluding stop words, punctuation, and spaces
+    return ' '.join(extract_keywords(text))
 
 def extract_keywords(text):
     """Extract important keywords from user input"""
     if nlp:
-        doc = nlp(text.lower())
-        keywords = []
-        for token in doc:
-            if (not token.is_stop and 
-                not token.is_punct and 
-                token.is_alpha and 
-                len(token.text) > 2):
-                keywords.append(token.lemma_)
-        return keywords
+        return keywords_from_doc(nlp(text.lower()))
     else:
         # Fallback keyword extraction
         text = text.lower()
@@ -121,104 +401,450 @@ def extract_keywords(text):
         words = [word for word in text.split() if len(word) > 2]
         return words
 
-def enhanced_similarity_search(user_input, threshold=0.15):
+def keywords_from_doc(doc):
+    """Keep the lemmas of meaningful tokens from a parsed spaCy Doc"""
+    return [
+        token.lemma_ for token in doc
+        if not token.is_stop
+        and not token.is_punct
+        and token.is_alpha
+        and len(token.text) > 2
+    ]
+
+# Result of parsing one user message, shared by every stage of a request
+TextAnalysis = namedtuple('TextAnalysis', ['text', 'language', 'keywords', 'processed_text'])
+
+def analyze_text(text, language=None, preferred_language=None):
+    """Run the NLP pipeline over the user's message once"""
+    with timed_stage('preprocess_text'):
+        keywords = extract_keywords(text)
+    if language is None:
+        with timed_stage('detect_language'):
+            language = detect_language(text, preferred_language)
+    return TextAnalysis(text, language, keywords, ' '.join(keywords))
+
+def extract_keywords_batch(texts, batch_size=64):
+    """extract_keywords for many texts, streaming them through spaCy in batches"""
+    if nlp:
+        docs = nlp.pipe((text.lower() for text in texts), batch_size=batch_size)
+        return [keywords_from_doc(doc) for doc in docs]
+    return [extract_keywords(text) for text in texts]
+
+def analyze_texts(texts, batch_size=64):
+    """Analyse many messages, parsing each once"""
+    return [
+        TextAnalysis(text, detect_language(text), keywords, ' '.join(keywords))
+        for text, keywords in zip(texts, extract_keywords_batch(texts, batch_size))
+    ]
+
+# Clarification suggestions offered alongside (or instead of) the best match
+SUGGESTION_COUNT = 3
+SUGGESTION_AMBIGUITY_MARGIN = 0.05  # runners-up this close to the answer are offered too
+SUGGESTION_MIN_SCORE = 0.05  # weaker candidates are not worth suggesting
+
+# Best answer (or None) plus the top-k ranked FAQ candidates it was chosen from
+SearchResult = namedtuple('SearchResult', ['answer', 'similarity', 'debug_info', 'candidates'])
+FaqCandidate = namedtuple('FaqCandidate', ['position', 'question', 'score'])
+
+def enhanced_similarity_search(user_input, threshold=0.15, language='en', analysis=None):
     """Enhanced similarity search with multiple matching strategies"""
-    if not faq_questions:
-        return None, 0, "No FAQ data available"
+    answer, similarity, debug_info, _ = search_faq(user_input, threshold, language, analysis)
+    return answer, similarity, debug_info
+
+def search_faq(user_input, threshold=0.15, language='en', analysis=None, top_k=SUGGESTION_COUNT + 1):
+    """Like enhanced_similarity_search, but also returns the top-k candidates"""
+    if analysis is None:
+        analysis = analyze_text(user_input, language)
+    index = get_faq_index(language)
+    if index.vectorizer is None:
+        return SearchResult(None, 0, "No FAQ data available", ())
 
+    combined_scores = score_faq_matches(index, [analysis])[0]
+    return best_faq_match(index, combined_scores, threshold, top_k)
+
+def score_faq_matches(index, analyses):
+    """Score a batch of analysed messages against every FAQ question in one pass"""
     # Strategy 1: TF-IDF Cosine Similarity
-    processed_input = preprocess_text(user_input)
-    input_vector = vectorizer.transform([processed_input])
-    similarities = cosine_similarity(input_vector, tfidf_matrix).flatten()
+    with timed_stage('cosine_similarity'):
+        input_vectors = index.vectorizer.transform([analysis.processed_text for analysis in analyses])
+        similarities = cosine_similarity(input_vectors, index.tfidf_matrix)
 
     # Strategy 2: Keyword matching boost
-    user_keywords = set(extract_keywords(user_input))
-    keyword_scores = []
-
-    for i, question in enumerate(faq_questions):
-        question_keywords = set(extract_keywords(question))
-        if user_keywords and question_keywords:
-            intersection = user_keywords.intersection(question_keywords)
-            keyword_score = len(intersection) / len(user_keywords.union(question_keywords))
-            keyword_scores.append(keyword_score)
-        else:
-            keyword_scores.append(0)
+    with timed_stage('keyword_similarity'):
+        keyword_scores = keyword_similarity(index, [set(analysis.keywords) for analysis in analyses])
 
-    # Combine scores with weights
-    combined_scores = []
-    for i in range(len(similarities)):
-        tfidf_score = similarities[i]
-        keyword_score = keyword_scores[i]
-        # Weighted combination: 70% TF-IDF, 30% keyword matching
-        combined_score = 0.7 * tfidf_score + 0.3 * keyword_score
-        combined_scores.append(combined_score)
+    # Weighted combination: 70% TF-IDF, 30% keyword matching
+    combined_scores = 0.7 * similarities + 0.3 * keyword_scores
 
+    # Strategy 3: dense vector similarity rescues paraphrases the lexical score misses
+    if index.dense_index is not None:
+        with timed_stage('dense_similarity'):
+            query_vectors = embed_texts(dense_models[index.language], [analysis.processed_text for analysis in analyses])
+            dense_scores = index.dense_index.search(query_vectors)
+        dense_scores = np.clip((dense_scores - DENSE_SIMILARITY_FLOOR) / (1 - DENSE_SIMILARITY_FLOOR), 0, 1)
+        combined_scores = np.maximum(combined_scores, DENSE_WEIGHT * dense_scores)
+
+    if index.active is not None:
+        # Tombstoned rows rank below every live question until compaction drops them
+        combined_scores = np.where(index.active, combined_scores, -1.0)
+
+    return combined_scores
+
+def best_faq_match(index, combined_scores, threshold=0.15, top_k=SUGGESTION_COUNT + 1):
+    """Pick the highest scoring FAQ answer if it clears the threshold"""
     best_match_idx = np.argmax(combined_scores)
     best_similarity = combined_scores[best_match_idx]
+    candidates = tuple(
+        FaqCandidate(int(position), index.questions[position], float(combined_scores[position]))
+        for position in top_faq_positions(combined_scores, best_match_idx, top_k)
+    )
 
     if best_similarity >= threshold:
         confidence = min(best_similarity * 100, 95)  # Cap confidence at 95%
-        return faq_answers[best_match_idx], best_similarity, f"Match confidence: {confidence:.1f}%"
+        return SearchResult(index.answers[best_match_idx], best_similarity, f"Match confidence: {confidence:.1f}%", candidates)
 
-    return None, best_similarity, f"Low confidence match: {best_similarity*100:.1f}%"
+    return SearchResult(None, best_similarity, f"Low confidence match: {best_similarity*100:.1f}%", candidates)
 
-def detect_language(text):
-    """Simple language detection for Spanish, Hindi vs English"""
-    spanish_keywords = ['qué', 'cómo', 'cuál', 'dónde', 'cuándo', 'por qué', 'síntomas', 'dolor', 'medicamento', 'doctor', 'salud', 'hospital', 'enfermedad']
-    hindi_keywords = ['क्या', 'कैसे', 'कौन', 'कहाँ', 'कब', 'क्यों', 'लक्षण', 'दर्द', 'दवा', 'डॉक्टर', 'स्वास्थ्य', 'अस्पताल', 'बीमारी', 'मैं', 'है', 'हैं', 'का', 'की', 'के']
-    text_lower = text.lower()
-    
-    spanish_count = sum(1 for word in spanish_keywords if word in text_lower)
-    hindi_count = sum(1 for word in hindi_keywords if word in text)  # Don't lowercase for Hindi
-    
-    if hindi_count > 0:
-        return 'hi'
-    elif spanish_count > 0:
-        return 'es'
-    else:
-        return 'en'
+def top_faq_positions(combined_scores, best_match_idx, top_k):
+    """The best match followed by the next highest scoring questions, without a full sort"""
+    runners_up = min(top_k, len(combined_scores)) - 1
+    if runners_up <= 0:
+        return [best_match_idx]
+
+    scores = combined_scores.copy()
+    scores[best_match_idx] = -np.inf
+    positions = np.argpartition(-scores, runners_up - 1)[:runners_up]
+    positions = positions[np.argsort(-scores[positions], kind='stable')]
+    return [best_match_idx] + positions.tolist()
+
+def clarification_suggestions(result):
+    """Runner-up FAQ questions to offer when the match is ambiguous or too weak to answer"""
+    if result.answer is not None:
+        # Only alternatives that scored almost as well as the answer given
+        return [
+            candidate.question for candidate in result.candidates[1:]
+            if candidate.score >= result.similarity - SUGGESTION_AMBIGUITY_MARGIN
+        ][:SUGGESTION_COUNT]
+    return [
+        candidate.question for candidate in result.candidates
+        if candidate.score >= SUGGESTION_MIN_SCORE
+    ][:SUGGESTION_COUNT]
+
+def keyword_similarity(index, keyword_sets):
+    """Jaccard overlap between each message's keywords and every FAQ question"""
+    rows, columns = [], []
+    for row, keywords in enumerate(keyword_sets):
+        for keyword in keywords:
+            column = index.keyword_vocabulary.get(keyword)
+            if column is not None:
+                rows.append(row)
+                columns.append(column)
+
+    query_matrix = csr_matrix(
+        (np.ones(len(rows)), (rows, columns)),
+        shape=(len(keyword_sets), len(index.keyword_vocabulary))
+    )
+    intersection = (query_matrix @ index.keyword_matrix.T).toarray()
+
+    user_counts = np.array([len(keywords) for keywords in keyword_sets], dtype=float)[:, None]
+    union = user_counts + index.keyword_counts[None, :] - intersection
+    scores = np.zeros_like(intersection)
+    np.divide(intersection, union, out=scores, where=(user_counts > 0) & (index.keyword_counts[None, :] > 0))
+    return scores
+
+# Language detection: Unicode script first, then character trigram profiles for Spanish vs English
+LANGUAGE_CONFIDENCE_THRESHOLD = 0.75  # below this an explicit /language choice wins
+LANGUAGE_SHARPNESS = 4.0  # scales the per-trigram log-likelihood margin into a probability
+SPANISH_MARKERS = frozenset('ñáéíóúü¿¡')
+
+def is_devanagari(char):
+    return '\u0900' <= char <= '\u097f'
+
+def character_trigrams(text):
+    """Padded character trigrams of each word, letters only"""
+    words = re.findall(r'[^\W\d_]+', text.lower())
+    return [
+        padded[i:i + 3]
+        for padded in (f' {word} ' for word in words)
+        for i in range(len(padded) - 2)
+    ]
+
+def build_language_profile(texts):
+    """Add-one smoothed trigram log-probabilities for one language"""
+    counts = Counter(trigram for text in texts for trigram in character_trigrams(text))
+    total = sum(counts.values()) + len(counts) + 1
+    return {trigram: math.log((count + 1) / total) for trigram, count in counts.items()}, math.log(1 / total)
+
+# Entries per language the profiles are trained on; enough to tell the languages
+# apart, and keeps building them fast however large the FAQ grows
+LANGUAGE_PROFILE_SAMPLE = 1000
+
+def build_language_profiles(faq_by_language):
+    """Trigram profiles for the Latin-script languages, trained on an even sample of their FAQ text"""
+    profiles = {}
+    for language in ('en', 'es'):
+        faq_items = faq_by_language.get(language, [])
+        sample = faq_items[::max(1, len(faq_items) // LANGUAGE_PROFILE_SAMPLE)][:LANGUAGE_PROFILE_SAMPLE]
+        profiles[language] = build_language_profile(
+            text for item in sample for text in (item['question'], item['answer'])
+        )
+    return profiles
+
+def classify_language(text):
+    """Return (language, confidence between 0.5 and 1) without running spaCy"""
+    letters = [char for char in text if char.isalpha() or is_devanagari(char)]
+    if not letters:
+        return 'en', 0.5
+
+    devanagari_share = sum(1 for char in letters if is_devanagari(char)) / len(letters)
+    if devanagari_share >= 0.5:
+        return 'hi', devanagari_share
+    if any(char in SPANISH_MARKERS for char in text.lower()):
+        return 'es', 1.0
+
+    trigrams = character_trigrams(text)
+    if not trigrams:
+        return 'en', 0.5
+    en_profile, en_unseen = language_profiles['en']
+    es_profile, es_unseen = language_profiles['es']
+    margin = sum(es_profile.get(t, es_unseen) - en_profile.get(t, en_unseen) for t in trigrams) / len(trigrams)
+    spanish_probability = 1 / (1 + math.exp(-LANGUAGE_SHARPNESS * margin))
+    if spanish_probability > 0.5:
+        return 'es', spanish_probability
+    return 'en', 1 - spanish_probability
+
+def detect_language(text, preferred_language=None):
+    """Detect Spanish, Hindi or English; when unsure, keep the preferred language (else English)"""
+    language, confidence = classify_language(text)
+    if confidence < LANGUAGE_CONFIDENCE_THRESHOLD:
+        return preferred_language or 'en'
+    return language
+
+class HistoryStore:
+    """Storage interface behind save_message_to_history and get_chat_history"""
+
+    def append(self, user_id, entry):
+        raise NotImplementedError
+
+    def get(self, user_id):
+        raise NotImplementedError
+
+    def clear(self, user_id):
+        raise NotImplementedError
+
+class InMemoryHistoryStore(HistoryStore):
+    """Per-process history with bounded messages per user and idle-session eviction"""
+
+    def __init__(self, max_messages=HISTORY_MAX_MESSAGES, idle_timeout=HISTORY_IDLE_TIMEOUT,
+                 max_sessions=HISTORY_MAX_SESSIONS):
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        # user_id -> (last activity, deque of messages), least recently active first
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def append(self, user_id, entry):
+        with self._lock:
+            now = time.monotonic()
+            _, messages = self._sessions.pop(user_id, (None, None))
+            if messages is None:
+                messages = deque(maxlen=self.max_messages)
+            messages.append(entry)
+            self._sessions[user_id] = (now, messages)
+            self._evict(now)
+
+    def get(self, user_id):
+        with self._lock:
+            item = self._sessions.get(user_id)
+            if item is None:
+                return []
+            self._sessions[user_id] = (time.monotonic(), item[1])
+            self._sessions.move_to_end(user_id)
+            return list(item[1])
+
+    def clear(self, user_id):
+        with self._lock:
+            self._sessions.pop(user_id, None)
+
+    def _evict(self, now):
+        # Oldest sessions sit at the front, so stop at the first active one
+        while self._sessions:
+            user_id, (last_active, _) = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - last_active < self.idle_timeout:
+                break
+            del self._sessions[user_id]
+
+class SqliteHistoryStore(HistoryStore):
+    """History shared by every worker process through a SQLite database in WAL mode"""
+
+    def __init__(self, path, max_messages=HISTORY_MAX_MESSAGES, idle_timeout=HISTORY_IDLE_TIMEOUT,
+                 write_batch=HISTORY_WRITE_BATCH, flush_interval=HISTORY_FLUSH_INTERVAL):
+        self.path = path
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.write_batch = write_batch
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._flusher_pid = None
+
+        conn = self._connection()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS chat_history (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                timestamp TEXT NOT NULL,
+                user_message TEXT NOT NULL,
+                bot_response TEXT NOT NULL,
+                language TEXT NOT NULL,
+                ist_display TEXT NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_history_user_id ON chat_history (user_id, id)")
+        conn.commit()
+        atexit.register(self.flush)
+
+    def _connection(self):
+        # SQLite connections can't be shared across threads or forked workers
+        conn = getattr(self._local, 'connection', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def append(self, user_id, entry):
+        with self._lock:
+            self._pending.append((user_id, time.time(), entry))
+            flush_now = len(self._pending) >= self.write_batch
+        if flush_now:
+            self.flush()
+        else:
+            self._start_flusher()
+
+    def get(self, user_id):
+        self.flush()
+        rows = self._connection().execute(
+            "SELECT timestamp, user_message, bot_response, language, ist_display FROM chat_history "
+            "WHERE user_id = ? ORDER BY id DESC LIMIT ?",
+            (user_id, self.max_messages)
+        ).fetchall()
+        return [
+            {
+                'timestamp': row[0],
+                'user_message': row[1],
+                'bot_response': row[2],
+                'language': row[3],
+                'ist_display': row[4]
+            }
+            for row in reversed(rows)
+        ]
+
+    def clear(self, user_id):
+        self.flush()
+        conn = self._connection()
+        with conn:
+            conn.execute("DELETE FROM chat_history WHERE user_id = ?", (user_id,))
+
+    def flush(self):
+        """Write buffered messages in one transaction and trim each user to max_messages"""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+
+        conn = self._connection()
+        with conn:
+            conn.executemany(
+                "INSERT INTO chat_history (user_id, created_at, timestamp, user_message, bot_response, language, ist_display) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (user_id, created_at, entry['timestamp'], entry['user_message'],
+                     entry['bot_response'], entry['language'], entry['ist_display'])
+                    for user_id, created_at, entry in pending
+                ]
+            )
+            conn.executemany(
+                "DELETE FROM chat_history WHERE user_id = ? AND id NOT IN "
+                "(SELECT id FROM chat_history WHERE user_id = ? ORDER BY id DESC LIMIT ?)",
+                [(user_id, user_id, self.max_messages) for user_id in {item[0] for item in pending}]
+            )
+
+    def evict_idle(self):
+        """Delete sessions with no messages newer than the idle timeout"""
+        conn = self._connection()
+        with conn:
+            conn.execute(
+                "DELETE FROM chat_history WHERE user_id IN "
+                "(SELECT user_id FROM chat_history GROUP BY user_id HAVING MAX(created_at) < ?)",
+                (time.time() - self.idle_timeout,)
+            )
+
+    def _start_flusher(self):
+        # Started lazily so each forked worker gets its own flusher thread
+        if self._flusher_pid == os.getpid():
+            return
+        with self._lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_loop, daemon=True).start()
+
+    def _flush_loop(self):
+        last_eviction = time.monotonic()
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+            if time.monotonic() - last_eviction >= 60:
+                self.evict_idle()
+                last_eviction = time.monotonic()
+
+def create_history_store():
+    """Use SQLite when CHAT_HISTORY_DB is set (shared across workers), else process memory"""
+    path = os.environ.get('CHAT_HISTORY_DB')
+    if path:
+        return SqliteHistoryStore(path)
+    return InMemoryHistoryStore()
+
+history_store = create_history_store()
 
 def get_or_create_session():
     """Get or create user session for chat history"""
     if 'user_id' not in session:
         session['user_id'] = str(uuid.uuid4())
-        session['language'] = 'en'
-        chat_histories[session['user_id']] = []
+        # Keep a language chosen through /language before the first message
+        session.setdefault('language', 'en')
     return session['user_id']
 
 def save_message_to_history(user_id, message, response, language='en'):
     """Save conversation to chat history with IST timezone"""
-    if user_id not in chat_histories:
-        chat_histories[user_id] = []
-    
     # Get current time in IST
     ist = pytz.timezone('Asia/Kolkata')
     ist_time = datetime.now(ist)
-    
-    chat_histories[user_id].append({
+
+    # The store keeps only the last HISTORY_MAX_MESSAGES messages per user
+    history_store.append(user_id, {
         'timestamp': ist_time.isoformat(),
         'user_message': message,
         'bot_response': response,
         'language': language,
         'ist_display': ist_time.strftime('%Y-%m-%d %H:%M:%S IST')
     })
-    
-    # Keep only last 50 messages per user
-    if len(chat_histories[user_id]) > 50:
-        chat_histories[user_id] = chat_histories[user_id][-50:]
 
 def get_chat_history(user_id):
     """Retrieve chat history for user"""
-    return chat_histories.get(user_id, [])
+    return history_store.get(user_id)
 
 def setup_language_vectorizer(language='en'):
     """Setup TF-IDF vectorizer for specific language"""
     if language == 'es':
-        try:
-            nlp_es = spacy.load("es_core_news_sm")
-            stop_words = 'spanish'
-        except OSError:
-            stop_words = ['el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 'para', 'al', 'del', 'los', 'las']
+        # scikit-learn only ships an English stop list
+        stop_words = ['el', 'la', 'de', 'que', 'y', 'a', 'en', 'un', 'es', 'se', 'no', 'te', 'lo', 'le', 'da', 'su', 'por', 'son', 'con', 'para', 'al', 'del', 'los', 'las']
     elif language == 'hi':
         # Hindi stop words and common words
         stop_words = ['का', 'की', 'के', 'में', 'से', 'को', 'पर', 'है', 'हैं', 'था', 'थी', 'थे', 'होना', 'होने', 'वाला', 'वाली', 'वाले', 'यह', 'वह', 'इस', 'उस', 'और', 'या', 'तो', 'जो', 'कि', 'लिए', 'साथ', 'बाद', 'पहले', 'दौरान', 'तक', 'द्वारा']
@@ -234,180 +860,1167 @@ def setup_language_vectorizer(language='en'):
         max_df=0.95
     )
 
-def generate_fallback_response(user_input, language='en'):
-    """Generate helpful fallback response for unmatched queries with bilingual support"""
-    keywords = extract_keywords(user_input)
+# Immutable per-language retrieval index, shared by all requests. Admin edits
+# append rows and clear their old row's `active` flag instead of refitting;
+# `pending_changes` counts the edits waiting for compaction to recompute IDF;
+# `dropped_terms` are the terms the fit left out (max_features, max_df).
+FaqIndex = namedtuple('FaqIndex', [
+    'language', 'questions', 'answers', 'vectorizer', 'tfidf_matrix',
+    'keyword_vocabulary', 'keyword_matrix', 'keyword_counts', 'dense_index',
+    'ids', 'active', 'pending_changes', 'dropped_terms'
+], defaults=[None, None, None, 0, frozenset()])
 
-    if language == 'es':
-        health_topics = {
-            'síntomas': 'Preguntaste sobre síntomas. Intenta preguntar sobre condiciones específicas como "síntomas de COVID-19" o "síntomas de diabetes".',
-            'dolor': 'Para preguntas sobre dolor, podrías preguntar sobre áreas específicas o condiciones.',
-            'medicamento': 'Para preguntas sobre medicamentos, consulta con un proveedor de atención médica o farmacéutico.',
-            'emergencia': 'Para emergencias médicas, llama al 911 inmediatamente.',
-            'doctor': 'Para encontrar o reservar citas con doctores, intenta preguntar "¿Cómo puedo reservar una cita con un doctor?"',
-            'seguro': 'Para preguntas sobre seguro de salud, intenta preguntar "¿Cómo solicito seguro de salud?"',
-            'sangre': 'Para preguntas sobre sangre, intenta preguntar sobre "rango normal de presión arterial" o similar.',
-            'corazón': 'Para preocupaciones del corazón, intenta preguntar "¿Qué hacer en caso de un ataque cardíaco?" o consulta a un cardiólogo.',
-            'mental': 'Para apoyo de salud mental, intenta preguntar "¿Cómo puedo mejorar mi salud mental?" o contacta a un profesional de salud mental.'
-        }
-        
-        base_response = "No pude encontrar una respuesta específica a tu pregunta en mi base de datos de atención médica. "
-        fallback_topics = "Aquí hay algunos temas con los que puedo ayudar:\n\n" + \
-                         "• Síntomas e información de COVID-19\n" + \
-                         "• Presión arterial y signos vitales\n" + \
-                         "• Reservar citas médicas\n" + \
-                         "• Aplicaciones de seguro de salud\n" + \
-                         "• Procedimientos de emergencia\n" + \
-                         "• Consejos de salud mental\n" + \
-                         "• Información general de chequeos médicos\n\n" + \
-                         "Por favor pregunta sobre cualquiera de estos temas, o consulta con un profesional de la salud para consejos médicos personalizados."
-    elif language == 'hi':
-        health_topics = {
-            'लक्षण': 'आपने लक्षणों के बारे में पूछा। विशिष्ट स्थितियों के बारे में पूछने की कोशिश करें जैसे "कोविड-19 के लक्षण" या "मधुमेह के लक्षण"।',
-            'दर्द': 'दर्द संबंधी प्रश्नों के लिए, आप विशिष्ट क्षेत्रों या स्थितियों के बारे में पूछ सकते हैं।',
-            'दवा': 'दवा के प्रश्नों के लिए, स्वास्थ्य प्रदाता या फार्मासिस्ट से सलाह लें।',
-            'आपातकाल': 'चिकित्सा आपातकाल के लिए, तुरंत 102 पर कॉल करें।',
-            'डॉक्टर': 'डॉक्टरों के साथ अपॉइंटमेंट बुक करने के लिए, "मैं डॉक्टर के साथ अपॉइंटमेंट कैसे बुक करूं?" पूछने की कोशिश करें।',
-            'बीमा': 'स्वास्थ्य बीमा प्रश्नों के लिए, "मैं स्वास्थ्य बीमा के लिए आवेदन कैसे करूं?" पूछने की कोशिश करें।',
-            'रक्त': 'रक्त संबंधी प्रश्नों के लिए, "सामान्य रक्तचाप की सीमा" या इसी तरह के बारे में पूछने की कोशिश करें।',
-            'दिल': 'हृदय संबंधी चिंताओं के लिए, "दिल का दौरा पड़ने पर क्या करना चाहिए?" पूछने की कोशिश करें या हृदय रोग विशेषज्ञ से सलाह लें।',
-            'मानसिक': 'मानसिक स्वास्थ्य सहायता के लिए, "मैं अपना मानसिक स्वास्थ्य कैसे सुधारूं?" पूछने की कोशिश करें या मानसिक स्वास्थ्य पेशेवर से संपर्क करें।'
+def faq_entry_ids(faq_items):
+    """Entry ids as an array (entries loaded from disk already carry unique ids)"""
+    return np.array([entry['id'] for entry in assign_faq_ids(faq_items)[0]], dtype=np.int64)
+
+def embed_texts(model, texts):
+    """Average word vectors per text as L2-normalised float32 rows
+
+    Callers pass keyword text (lemmas without stop words): averaged over whole
+    sentences, the shared "what is the ..." words make unrelated questions look alike.
+    """
+    vectors = np.array([model.make_doc(text.lower()).vector for text in texts], dtype=np.float32)
+    vectors = vectors.reshape(len(texts), -1)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+class DenseIndex:
+    """Cosine search over FAQ embeddings: brute-force matmul, or IVF lists for large corpora"""
+
+    def __init__(self, embeddings, n_probe=DENSE_IVF_PROBES, ivf_min_size=DENSE_IVF_MIN_SIZE):
+        self.embeddings = embeddings
+        self.n_probe = n_probe
+        self.centroids = None
+        self.order = None
+        self.boundaries = None
+        self.lists = None
+        if len(embeddings) >= ivf_min_size:
+            self._train_ivf()
+
+    @classmethod
+    def from_arrays(cls, embeddings, centroids=None, order=None, boundaries=None):
+        """Restore a saved index without retraining its clusters"""
+        dense_index = cls(embeddings, ivf_min_size=float('inf'))
+        if centroids is not None:
+            dense_index._set_lists(centroids, order, boundaries)
+        return dense_index
+
+    def _set_lists(self, centroids, order, boundaries):
+        self.centroids = centroids
+        self.order = order
+        self.boundaries = boundaries
+        self.lists = [order[boundaries[i]:boundaries[i + 1]] for i in range(len(centroids))]
+
+    def _train_ivf(self, iterations=10, chunk_size=8192):
+        # Spherical k-means with about sqrt(n) clusters
+        n_lists = int(np.sqrt(len(self.embeddings)))
+        rng = np.random.default_rng(0)
+        centroids = self.embeddings[rng.choice(len(self.embeddings), n_lists, replace=False)]
+        for _ in range(iterations):
+            assignments = np.concatenate([
+                np.argmax(self.embeddings[start:start + chunk_size] @ centroids.T, axis=1)
+                for start in range(0, len(self.embeddings), chunk_size)
+            ])
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignments, self.embeddings)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            # Empty clusters keep their previous centroid
+            centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids).astype(np.float32)
+
+        order = np.argsort(assignments, kind='stable')
+        boundaries = np.searchsorted(assignments[order], np.arange(n_lists + 1))
+        self._set_lists(centroids, order, boundaries)
+
+    def search(self, query_vectors):
+        """Cosine similarity of each query to every FAQ question (0 where not probed)"""
+        if self.centroids is None:
+            return query_vectors @ self.embeddings.T
+
+        scores = np.zeros((len(query_vectors), len(self.embeddings)), dtype=np.float32)
+        n_probe = min(self.n_probe, len(self.centroids))
+        probes = np.argpartition(-(query_vectors @ self.centroids.T), n_probe - 1, axis=1)[:, :n_probe]
+        for row, clusters in enumerate(probes):
+            candidates = np.concatenate([self.lists[cluster] for cluster in clusters])
+            scores[row, candidates] = self.embeddings[candidates] @ query_vectors[row]
+        return scores
+
+    def appended(self, vectors):
+        """A copy with extra rows, filed under their nearest existing cluster"""
+        dense_index = DenseIndex.from_arrays(np.vstack([self.embeddings, vectors]))
+        if self.centroids is not None:
+            order, boundaries = self.order, np.array(self.boundaries)
+            for row, cluster in enumerate(np.argmax(vectors @ self.centroids.T, axis=1), len(self.embeddings)):
+                order = np.insert(order, boundaries[cluster + 1], row)
+                boundaries[cluster + 1:] += 1
+            dense_index._set_lists(self.centroids, order, boundaries)
+        return dense_index
+
+def build_keyword_matrix(keyword_lists):
+    """Precompute each FAQ question's keyword set as a binary question x keyword matrix"""
+    vocabulary = {}
+    rows, columns = [], []
+    for row, keywords in enumerate(keyword_lists):
+        for keyword in set(keywords):
+            rows.append(row)
+            columns.append(vocabulary.setdefault(keyword, len(vocabulary)))
+
+    matrix = csr_matrix(
+        (np.ones(len(rows)), (rows, columns)),
+        shape=(len(keyword_lists), len(vocabulary))
+    )
+    counts = np.asarray(matrix.sum(axis=1)).ravel()
+    return vocabulary, matrix, counts
+
+def build_faq_index(language, faq_items):
+    """Fit the TF-IDF index for one language's FAQ entries"""
+    questions = tuple(item['question'] for item in faq_items)
+    answers = tuple(item['answer'] for item in faq_items)
+    ids = faq_entry_ids(faq_items)
+    if not questions:
+        return FaqIndex(language, questions, answers, None, None, {}, None, None, ids=ids)
+
+    # One spaCy pass feeds both the keyword sets and the TF-IDF text
+    keyword_lists = extract_keywords_batch(questions)
+    keyword_vocabulary, keyword_matrix, keyword_counts = build_keyword_matrix(keyword_lists)
+    vectorizer = setup_language_vectorizer(language)
+    processed_questions = [' '.join(keywords) for keywords in keyword_lists]
+    try:
+        tfidf_matrix = vectorizer.fit_transform(processed_questions)
+    except ValueError as e:
+        # Preprocessing left no usable terms (e.g. script the NLP model can't tokenize)
+        print(f"Could not build '{language}' FAQ index: {e}", file=sys.stderr)
+        return FaqIndex(language, questions, answers, None, None, {}, None, None, ids=ids)
+
+    dense_index = None
+    if language in dense_models:
+        dense_index = DenseIndex(embed_texts(dense_models[language], processed_questions))
+
+    return FaqIndex(
+        language, questions, answers, vectorizer, tfidf_matrix,
+        keyword_vocabulary, keyword_matrix, keyword_counts, dense_index, ids,
+        dropped_terms=dropped_vectorizer_terms(vectorizer, processed_questions)
+    )
+
+def dropped_vectorizer_terms(vectorizer, processed_questions):
+    """Terms the fitted questions contain that the vectorizer left out of its vocabulary"""
+    analyzer = vectorizer.build_analyzer()
+    return frozenset(
+        term for text in processed_questions for term in analyzer(text)
+        if term not in vectorizer.vocabulary_
+    )
+
+def build_faq_indexes(faq_by_language):
+    """Build the read-only registry of per-language FAQ indexes"""
+    return MappingProxyType({
+        language: build_faq_index(language, items)
+        for language, items in faq_by_language.items()
+    })
+
+# Prebuilt index artifacts written by `python main.py build-index`
+INDEX_FORMAT_VERSION = 4
+FAQ_INDEX_DIR = os.environ.get('FAQ_INDEX_DIR')
+
+def faq_source_hash(language):
+    """SHA-256 of a language's FAQ file, used to detect stale artifacts"""
+    try:
+        with open(FAQ_FILES[language], 'rb') as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except FileNotFoundError:
+        return None
+
+def index_build_environment():
+    """What besides the FAQ text decides an index's contents: the NLP model and library versions"""
+    return {
+        'nlp_model': f"{nlp.meta['lang']}_{nlp.meta['name']}-{nlp.meta['version']}" if nlp else 'fallback',
+        'spacy_version': spacy.__version__,
+        'sklearn_version': sklearn.__version__
+    }
+
+def save_faq_indexes(indexes, output_dir, profiles):
+    """Write the indexes and language profiles as a versioned artifact directory and point CURRENT at it"""
+    languages = {}
+    for language, index in indexes.items():
+        languages[language] = {
+            'source_sha256': faq_source_hash(language),
+            'rows': len(index.questions),
+            'searchable': index.vectorizer is not None,
+            'dense_model': dense_models[language].meta.get('name') if index.dense_index is not None else None
         }
-        
-        base_response = "मुझे अपने स्वास्थ्य डेटाबेस में आपके प्रश्न का विशिष्ट उत्तर नहीं मिला। "
-        fallback_topics = "यहाँ कुछ विषय हैं जिनमें मैं मदद कर सकता हूँ:\n\n" + \
-                         "• कोविड-19 के लक्षण और जानकारी\n" + \
-                         "• रक्तचाप और महत्वपूर्ण संकेत\n" + \
-                         "• डॉक्टर की अपॉइंटमेंट बुकिंग\n" + \
-                         "• स्वास्थ्य बीमा आवेदन\n" + \
-                         "• आपातकालीन प्रक्रियाएं\n" + \
-                         "• मानसिक स्वास्थ्य टिप्स\n" + \
-                         "• सामान्य स्वास्थ्य जांच की जानकारी\n\n" + \
-                         "कृपया इनमें से किसी भी विषय के बारे में पूछें, या व्यक्तिगत चिकित्सा सलाह के लिए स्वास्थ्य पेशेवर से सलाह लें।"
-    else:
-        health_topics = {
-            'symptoms': 'You asked about symptoms. Try asking about specific conditions like "COVID-19 symptoms" or "diabetes symptoms".',
-            'pain': 'For pain-related questions, you might want to ask about specific areas or conditions.',
-            'medication': 'For medication questions, consult with a healthcare provider or pharmacist.',
-            'emergency': 'For medical emergencies, call 911 immediately.',
-            'doctor': 'To find or book appointments with doctors, try asking "How can I book an appointment with a doctor?"',
-            'insurance': 'For health insurance questions, try asking "How do I apply for health insurance?"',
-            'blood': 'For blood-related questions, try asking about "normal blood pressure range" or similar.',
-            'heart': 'For heart-related concerns, try asking "What to do in case of a heart attack?" or consult a cardiologist.',
-            'mental': 'For mental health support, try asking "How can I improve my mental health?" or contact a mental health professional.'
+    environment = index_build_environment()
+
+    index_version = hashlib.sha256(json.dumps(
+        [INDEX_FORMAT_VERSION, languages, environment], sort_keys=True
+    ).encode('utf-8')).hexdigest()[:12]
+    version_dir = os.path.join(output_dir, index_version)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # An existing version directory already holds these exact artifacts, and
+    # running workers may have its arrays memory-mapped, so it is never rewritten.
+    # New versions are written under a temporary name and renamed into place.
+    if not os.path.isdir(version_dir):
+        staging_dir = tempfile.mkdtemp(prefix=f'.{index_version}-', dir=output_dir)
+        os.chmod(staging_dir, 0o755)
+        write_faq_index_files(staging_dir, indexes, profiles, {
+            'format_version': INDEX_FORMAT_VERSION,
+            'index_version': index_version,
+            'built_at': datetime.now(pytz.utc).isoformat(),
+            'environment': environment,
+            'languages': languages
+        })
+        try:
+            os.rename(staging_dir, version_dir)
+        except OSError:
+            # A concurrent build finished the same version first
+            shutil.rmtree(staging_dir)
+
+    current_path = os.path.join(output_dir, 'CURRENT')
+    with open(current_path + '.tmp', 'w', encoding='utf-8') as f:
+        f.write(index_version)
+    os.replace(current_path + '.tmp', current_path)
+    return version_dir
+
+def write_faq_index_files(directory, indexes, profiles, manifest):
+    """Write every language's vocabularies and arrays, the language profiles and the manifest"""
+    for language, index in indexes.items():
+        if index.vectorizer is None:
+            continue
+        vocabulary = sorted(index.vectorizer.vocabulary_, key=index.vectorizer.vocabulary_.get)
+        keyword_vocabulary = sorted(index.keyword_vocabulary, key=index.keyword_vocabulary.get)
+        with open(os.path.join(directory, f'{language}.json'), 'w', encoding='utf-8') as f:
+            json.dump({
+                'vocabulary': vocabulary,
+                'keyword_vocabulary': keyword_vocabulary,
+                'dropped_terms': sorted(index.dropped_terms)
+            }, f, ensure_ascii=False)
+
+        arrays = {
+            'idf': index.vectorizer.idf_,
+            'tfidf_data': index.tfidf_matrix.data,
+            'tfidf_indices': index.tfidf_matrix.indices,
+            'tfidf_indptr': index.tfidf_matrix.indptr,
+            'keyword_indices': index.keyword_matrix.indices,
+            'keyword_indptr': index.keyword_matrix.indptr
         }
-        
-        base_response = "I couldn't find a specific answer to your question in my healthcare database. "
-        fallback_topics = "Here are some topics I can help with:\n\n" + \
-                         "• COVID-19 symptoms and information\n" + \
-                         "• Blood pressure and vital signs\n" + \
-                         "• Booking doctor appointments\n" + \
-                         "• Health insurance applications\n" + \
-                         "• Emergency procedures\n" + \
-                         "• Mental health tips\n" + \
-                         "• General health checkup information\n\n" + \
-                         "Please ask about any of these topics, or consult with a healthcare professional for personalized medical advice."
-
-    suggestions = []
-    for keyword in keywords:
-        for topic, suggestion in health_topics.items():
-            if keyword in topic or topic in keyword:
-                suggestions.append(suggestion)
-                break
+        if index.dense_index is not None:
+            arrays['dense_embeddings'] = index.dense_index.embeddings
+            if index.dense_index.centroids is not None:
+                arrays['ivf_centroids'] = index.dense_index.centroids
+                arrays['ivf_order'] = index.dense_index.order
+                arrays['ivf_boundaries'] = index.dense_index.boundaries
+        # Stored uncompressed so the server can memory-map the arrays
+        np.savez(os.path.join(directory, f'{language}.npz'), **arrays)
 
-    if suggestions:
-        return base_response + " " + suggestions[0] + "\n\nPara preocupaciones médicas específicas, por favor consulta con un profesional de la salud calificado." if language == 'es' else base_response + " " + suggestions[0] + "\n\nFor specific medical concerns, please consult with a qualified healthcare professional."
+    with open(os.path.join(directory, 'language_profiles.json'), 'w', encoding='utf-8') as f:
+        json.dump(profiles, f, ensure_ascii=False)
+
+    with open(os.path.join(directory, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+def load_npz_mmap(path):
+    """Memory-map every array in an uncompressed .npz file"""
+    arrays = {}
+    with zipfile.ZipFile(path) as archive, open(path, 'rb') as f:
+        for info in archive.infolist():
+            # Array data starts after the zip local header and the .npy header
+            f.seek(info.header_offset + 26)
+            name_length, extra_length = np.frombuffer(f.read(4), dtype='<u2')
+            f.seek(info.header_offset + 30 + name_length + extra_length)
+            version = np.lib.format.read_magic(f)
+            if version == (1, 0):
+                shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(f)
+            else:
+                shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(f)
+            arrays[info.filename[:-len('.npy')]] = np.memmap(
+                path, dtype=dtype, mode='r', offset=f.tell(), shape=shape,
+                order='F' if fortran_order else 'C'
+            )
+    return arrays
+
+def load_faq_index_artifacts(index_dir, faq_by_language):
+    """Load prebuilt indexes whose source FAQ file and settings still match
+
+    Returns (indexes, language profiles); the profiles are None unless the
+    English and Spanish artifacts they were trained with are both current.
+    """
+    try:
+        with open(os.path.join(index_dir, 'CURRENT'), encoding='utf-8') as f:
+            version_dir = os.path.join(index_dir, f.read().strip())
+        with open(os.path.join(version_dir, 'manifest.json'), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        print(f"No prebuilt FAQ index found in {index_dir}", file=sys.stderr)
+        return {}, None
+    if manifest.get('format_version') != INDEX_FORMAT_VERSION:
+        return {}, None
+    if manifest['environment'] != index_build_environment():
+        # Another NLP model or library version would produce different vocabularies
+        print(f"Prebuilt FAQ index in {version_dir} was built with {manifest['environment']}, rebuilding",
+              file=sys.stderr)
+        return {}, None
+
+    indexes = {}
+    for language, entry in manifest['languages'].items():
+        items = faq_by_language.get(language, [])
+        dense_model = dense_models[language].meta.get('name') if language in dense_models else None
+        if (entry['source_sha256'] != faq_source_hash(language) or entry['rows'] != len(items)
+                or entry['dense_model'] != dense_model):
+            print(f"Prebuilt '{language}' FAQ index is stale, rebuilding", file=sys.stderr)
+            continue
+
+        questions = tuple(item['question'] for item in items)
+        answers = tuple(item['answer'] for item in items)
+        ids = faq_entry_ids(items)
+        if not entry['searchable']:
+            indexes[language] = FaqIndex(language, questions, answers, None, None, {}, None, None, ids=ids)
+            continue
+
+        with open(os.path.join(version_dir, f'{language}.json'), encoding='utf-8') as f:
+            vocabularies = json.load(f)
+        arrays = load_npz_mmap(os.path.join(version_dir, f'{language}.npz'))
+
+        vectorizer = setup_language_vectorizer(language)
+        vectorizer.vocabulary_ = {term: i for i, term in enumerate(vocabularies['vocabulary'])}
+        vectorizer.idf_ = arrays['idf']
+        tfidf_matrix = csr_matrix(
+            (arrays['tfidf_data'], arrays['tfidf_indices'], arrays['tfidf_indptr']),
+            shape=(len(questions), len(vocabularies['vocabulary'])), copy=False
+        )
+
+        keyword_vocabulary = {keyword: i for i, keyword in enumerate(vocabularies['keyword_vocabulary'])}
+        keyword_matrix = csr_matrix(
+            (np.ones(len(arrays['keyword_indices'])), arrays['keyword_indices'], arrays['keyword_indptr']),
+            shape=(len(questions), len(keyword_vocabulary))
+        )
+        keyword_counts = np.diff(arrays['keyword_indptr']).astype(float)
+
+        dense_index = None
+        if 'dense_embeddings' in arrays:
+            dense_index = DenseIndex.from_arrays(
+                arrays['dense_embeddings'], arrays.get('ivf_centroids'),
+                arrays.get('ivf_order'), arrays.get('ivf_boundaries')
+            )
+
+        indexes[language] = FaqIndex(
+            language, questions, answers, vectorizer, tfidf_matrix,
+            keyword_vocabulary, keyword_matrix, keyword_counts, dense_index, ids,
+            dropped_terms=frozenset(vocabularies['dropped_terms'])
+        )
+
+    profiles = None
+    if 'en' in indexes and 'es' in indexes:
+        with open(os.path.join(version_dir, 'language_profiles.json'), encoding='utf-8') as f:
+            profiles = {language: tuple(profile) for language, profile in json.load(f).items()}
+    return indexes, profiles
+
+def load_or_build_faq_indexes(faq_by_language):
+    """Use prebuilt artifacts from FAQ_INDEX_DIR where valid, building the rest
+
+    Returns the index registry and the language detection profiles.
+    """
+    prebuilt, profiles = load_faq_index_artifacts(FAQ_INDEX_DIR, faq_by_language) if FAQ_INDEX_DIR else ({}, None)
+    indexes = MappingProxyType({
+        language: prebuilt[language] if language in prebuilt else build_faq_index(language, items)
+        for language, items in faq_by_language.items()
+    })
+    return indexes, profiles or build_language_profiles(faq_by_language)
+
+_build_started = time.perf_counter()
+faq_indexes, language_profiles = load_or_build_faq_indexes(multilingual_faq)
+
+# Reported on /health; updated whenever the indexes are rebuilt
+faq_index_info = {
+    'version': 1,
+    'build_seconds': time.perf_counter() - _build_started,
+    'built_at': datetime.now(pytz.utc).isoformat(),
+    'last_error': None
+}
+# Reentrant so an admin edit can reload a file another worker changed
+faq_index_lock = threading.RLock()
+# Admin edits applied since each language's index was last fitted, replayed
+# onto a compacted index that was built while they arrived
+faq_update_logs = {language: [] for language in FAQ_FILES}
+
+def rebuild_faq_indexes(languages=None):
+    """Reload FAQ files and swap in freshly built indexes for the given languages"""
+    global faq_indexes, multilingual_faq, faq_data, loaded_faq_mtimes, language_profiles
+    if languages is None:
+        languages = list(FAQ_FILES)
+
+    with faq_index_lock:
+        started = time.perf_counter()
+        mtimes = dict(loaded_faq_mtimes)
+        faq_by_language = dict(multilingual_faq)
+        indexes = dict(faq_indexes)
+        # Read the files under the lock so they match the edit log position,
+        # but fit the indexes without holding up other workers' admin edits
+        with faq_file_lock():
+            current_mtimes = faq_file_mtimes()
+            for language in languages:
+                mtimes[language] = current_mtimes[language]
+                faq_by_language[language] = load_faq_entries(language)
+                faq_edit_log_offsets[language] = faq_edit_log_size()
+        for language in languages:
+            indexes[language] = build_faq_index(language, faq_by_language[language])
+
+        # Requests hold on to the index they looked up, so rebinding the
+        # registry swaps every language in at once without disturbing them
+        faq_indexes = MappingProxyType(indexes)
+        language_profiles = build_language_profiles(faq_by_language)
+        multilingual_faq = faq_by_language
+        faq_data = faq_by_language['en']
+        loaded_faq_mtimes = mtimes
+        for language in languages:
+            faq_update_logs[language] = []
+        faq_index_info.update({
+            'version': faq_index_info['version'] + 1,
+            'build_seconds': time.perf_counter() - started,
+            'built_at': datetime.now(pytz.utc).isoformat(),
+            'last_error': None
+        })
+
+def rebuild_faq_indexes_in_background(languages=None):
+    """Rebuild on a worker thread, keeping the current indexes if loading fails"""
+    def run():
+        try:
+            rebuild_faq_indexes(languages)
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"FAQ index rebuild failed: {e}", file=sys.stderr)
+            faq_index_info['last_error'] = str(e)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+def watch_faq_files(interval):
+    """Replay other workers' admin edits and rebuild the languages whose files were edited by hand"""
+    failed_mtimes = {}
+    while True:
+        time.sleep(interval)
+        with faq_index_lock, faq_file_lock():
+            replay_faq_edit_log()
+        current_mtimes = faq_file_mtimes()
+        # Replayed and local admin edits record their writes in loaded_faq_mtimes, so they don't trigger a rebuild
+        changed = [
+            language for language, mtime in current_mtimes.items()
+            if mtime != loaded_faq_mtimes.get(language) and mtime != failed_mtimes.get(language)
+        ]
+        if changed:
+            rebuild_faq_indexes_in_background(changed).join()
+            # A file that fails to load is retried only after it changes again
+            failed_mtimes = {
+                language: current_mtimes[language] for language in changed
+                if loaded_faq_mtimes.get(language) != current_mtimes[language]
+            }
+
+def compact_faq_indexes_periodically(interval):
+    """Refit the indexes that have collected admin edits"""
+    while True:
+        time.sleep(interval)
+        for language in FAQ_FILES:
+            try:
+                compact_faq_index(language)
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"FAQ index compaction failed for '{language}': {e}", file=sys.stderr)
+                faq_index_info['last_error'] = str(e)
+
+# Set FAQ_WATCH_INTERVAL (seconds) to pick up FAQ file edits without a restart
+FAQ_WATCH_INTERVAL = float(os.environ.get('FAQ_WATCH_INTERVAL', 0))
+# Seconds between compactions that recompute IDF after admin edits (0 disables)
+FAQ_COMPACTION_INTERVAL = float(os.environ.get('FAQ_COMPACTION_INTERVAL', 300))
+faq_threads_pid = None
+
+def start_faq_threads():
+    """Start the FAQ watcher and compactor once per process (threads don't survive a fork)"""
+    global faq_threads_pid
+    if faq_threads_pid == os.getpid():
+        return
+    with faq_index_lock:
+        if faq_threads_pid == os.getpid():
+            return
+        faq_threads_pid = os.getpid()
+    if FAQ_WATCH_INTERVAL > 0:
+        threading.Thread(target=watch_faq_files, args=(FAQ_WATCH_INTERVAL,), daemon=True).start()
+    if FAQ_COMPACTION_INTERVAL > 0:
+        threading.Thread(
+            target=compact_faq_indexes_periodically, args=(FAQ_COMPACTION_INTERVAL,), daemon=True
+        ).start()
+
+def get_faq_index(language='en'):
+    """Look up the FAQ index for a language, falling back to English"""
+    index = faq_indexes.get(language)
+    if index is None or not index.questions:
+        index = faq_indexes['en']
+    return index
+
+# Incremental updates: one admin edit, applied to a copy of the index without refitting
+FaqUpdate = namedtuple('FaqUpdate', ['entry_id', 'entry'])  # entry None removes it
+
+def live_faq_row(index, entry_id):
+    """Row holding the live version of an entry, or None"""
+    rows = np.flatnonzero(index.ids == entry_id)
+    if index.active is not None:
+        rows = rows[index.active[rows]]
+    return int(rows[-1]) if len(rows) else None
+
+def extend_vectorizer(index, processed_question):
+    """The index's vectorizer, plus columns for terms the corpus has never seen
+
+    New terms get the IDF of a term seen in one document until compaction
+    refits the real document frequencies. Terms the fit dropped (too common,
+    or past max_features) stay out, as they carry no weight in older rows.
+    """
+    vocabulary = index.vectorizer.vocabulary_
+    new_terms = [
+        term for term in dict.fromkeys(index.vectorizer.build_analyzer()(processed_question))
+        if term not in vocabulary and term not in index.dropped_terms
+    ]
+    if not new_terms:
+        return index.vectorizer
+
+    # A fresh vectorizer, as when loading artifacts: the fitted one is shared with running requests
+    vectorizer = setup_language_vectorizer(index.language)
+    vectorizer.vocabulary_ = dict(vocabulary)
+    for term in new_terms:
+        vectorizer.vocabulary_[term] = len(vectorizer.vocabulary_)
+    documents = len(index.questions) + 1
+    provisional_idf = np.log((1 + documents) / 2) + 1  # smooth_idf with df = 1
+    vectorizer.idf_ = np.append(index.vectorizer.idf_, np.full(len(new_terms), provisional_idf))
+    return vectorizer
+
+def append_faq_row(index, entry):
+    """A copy of the index with one more question, weighted by the IDF it was fitted with"""
+    question = entry['question']
+    keywords = extract_keywords(question)
+    processed_question = ' '.join(keywords)
+    vectorizer = extend_vectorizer(index, processed_question)
+    previous = index.tfidf_matrix
+    tfidf_matrix = vstack([
+        csr_matrix((previous.data, previous.indices, previous.indptr),
+                   shape=(previous.shape[0], len(vectorizer.vocabulary_))),
+        vectorizer.transform([processed_question])
+    ], format='csr')
+
+    # New keywords get new columns; existing rows simply have no entries in them
+    keyword_vocabulary = dict(index.keyword_vocabulary)
+    columns = sorted({keyword_vocabulary.setdefault(keyword, len(keyword_vocabulary))
+                      for keyword in keywords})
+    previous = index.keyword_matrix
+    keyword_matrix = vstack([
+        csr_matrix((previous.data, previous.indices, previous.indptr),
+                   shape=(previous.shape[0], len(keyword_vocabulary))),
+        csr_matrix((np.ones(len(columns)), ([0] * len(columns), columns)), shape=(1, len(keyword_vocabulary)))
+    ], format='csr')
+
+    dense_index = index.dense_index
+    if dense_index is not None:
+        dense_index = dense_index.appended(embed_texts(dense_models[index.language], [processed_question]))
+
+    active = np.ones(len(index.questions), dtype=bool) if index.active is None else index.active
+    return index._replace(
+        questions=index.questions + (question,),
+        answers=index.answers + (entry['answer'],),
+        vectorizer=vectorizer,
+        tfidf_matrix=tfidf_matrix,
+        keyword_vocabulary=keyword_vocabulary,
+        keyword_matrix=keyword_matrix,
+        keyword_counts=np.append(index.keyword_counts, len(columns)),
+        dense_index=dense_index,
+        ids=np.append(index.ids, entry['id']),
+        active=np.append(active, True),
+        pending_changes=index.pending_changes + 1
+    )
+
+def tombstone_faq_row(index, row):
+    """A copy of the index with one row excluded from matching"""
+    active = np.ones(len(index.questions), dtype=bool) if index.active is None else index.active.copy()
+    active[row] = False
+    return index._replace(active=active, pending_changes=index.pending_changes + 1)
+
+def apply_faq_update(index, update, faq_items):
+    """Apply one admin edit to an index; faq_items is the language's entry list after it"""
+    if index.vectorizer is None:
+        # Nothing fitted to append to yet, so fit the (small) corpus outright
+        return build_faq_index(index.language, faq_items)
+
+    row = live_faq_row(index, update.entry_id)
+    if update.entry is not None and row is not None and index.questions[row] == update.entry['question']:
+        # Answer-only edits leave the scoring untouched
+        answers = list(index.answers)
+        answers[row] = update.entry['answer']
+        return index._replace(answers=tuple(answers))
+
+    if row is not None:
+        index = tombstone_faq_row(index, row)
+    if update.entry is not None:
+        index = append_faq_row(index, update.entry)
+    if index.active is not None and not index.active.any():
+        return build_faq_index(index.language, faq_items)
+    return index
+
+def save_faq_file(language, faq_items):
+    """Atomically rewrite a language's FAQ file"""
+    path = FAQ_FILES[language]
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(faq_items, f, ensure_ascii=False, indent=2)
+        f.write('\n')
+    os.replace(path + '.tmp', path)
+
+def update_faq_entry(language, entry_id=None, changes=None):
+    """Add (no entry_id), patch (changes) or remove (no changes) one FAQ entry, live and on disk
+
+    Returns the resulting entry (the removed one for deletes), or None if entry_id is unknown.
+    """
+    with faq_index_lock, faq_file_lock():
+        # Another worker may have saved its own edits since this one loaded the
+        # file; editing the stale list would drop them and reuse their ids
+        replay_faq_edit_log()
+        if faq_file_mtimes()[language] != loaded_faq_mtimes.get(language):
+            rebuild_faq_indexes([language])  # edited by hand
+        refresh_faq_next_ids()
+
+        # Ids are saved with every entry so they survive restarts and compaction
+        if entry_id is None:
+            entry = {'id': faq_next_ids[language], **changes}
+            faq_next_ids[language] += 1
+            save_faq_next_ids()
+        else:
+            entry = next((item for item in multilingual_faq[language] if item['id'] == entry_id), None)
+            if entry is None:
+                return None
+            if changes is not None:
+                entry = dict(entry, **changes)
+
+        update = FaqUpdate(entry['id'], entry if changes is not None else None)
+        faq_items = faq_items_with_update(multilingual_faq[language], update)
+        index = apply_faq_update(faq_indexes[language], update, faq_items)
+        save_faq_file(language, faq_items)
+        mtime = faq_file_mtimes()[language]
+        append_faq_edit_log(language, update, mtime)
+        install_faq_update(language, update, faq_items, index, mtime)
+    return entry
+
+def install_faq_update(language, update, faq_items, index, mtime):
+    """Swap in a language's entries and index after one edit (caller holds faq_index_lock)"""
+    global faq_indexes, multilingual_faq, faq_data, loaded_faq_mtimes
+    faq_indexes = MappingProxyType(dict(faq_indexes, **{language: index}))
+    multilingual_faq = dict(multilingual_faq, **{language: faq_items})
+    faq_data = multilingual_faq['en']
+    loaded_faq_mtimes = dict(loaded_faq_mtimes, **{language: mtime})
+    faq_update_logs[language].append(update)
+    faq_index_info['version'] += 1
+
+def faq_items_with_update(faq_items, update):
+    """A language's entry list with one edit applied"""
+    faq_items = list(faq_items)
+    position = next((i for i, item in enumerate(faq_items) if item['id'] == update.entry_id), None)
+    if update.entry is None:
+        if position is not None:
+            del faq_items[position]
+    elif position is None:
+        faq_items.append(update.entry)
     else:
-        return base_response + fallback_topics
+        faq_items[position] = update.entry
+    return faq_items
+
+def append_faq_edit_log(language, update, mtime):
+    """Record an admin edit, and the FAQ file mtime it produced, for the other workers"""
+    record = {'language': language, 'id': update.entry_id, 'entry': update.entry, 'mtime': mtime}
+    with open(FAQ_EDIT_LOG, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + '\n')
+    # This worker was caught up before the edit, so it is current to the end of the log
+    faq_edit_log_offsets.update(dict.fromkeys(faq_edit_log_offsets, faq_edit_log_size()))
+
+def replay_faq_edit_log():
+    """Apply the admin edits other workers logged since this one last read the log
+
+    The caller holds faq_index_lock and faq_file_lock.
+    """
+    size = faq_edit_log_size()
+    if size < max(faq_edit_log_offsets.values()):
+        # The log was removed or truncated; the files hold every earlier edit
+        faq_edit_log_offsets.update(dict.fromkeys(faq_edit_log_offsets, 0))
+    position = min(faq_edit_log_offsets.values())
+    if position >= size:
+        return
+
+    with open(FAQ_EDIT_LOG, 'rb') as f:
+        f.seek(position)
+        for line in f:
+            record_position, position = position, position + len(line)
+            record = json.loads(line)
+            language = record['language']
+            # Languages reloaded from disk since the edit already contain it
+            if language not in faq_edit_log_offsets or record_position < faq_edit_log_offsets[language]:
+                continue
+            update = FaqUpdate(record['id'], record['entry'])
+            faq_items = faq_items_with_update(multilingual_faq[language], update)
+            index = apply_faq_update(faq_indexes[language], update, faq_items)
+            install_faq_update(language, update, faq_items, index, record['mtime'])
+    faq_edit_log_offsets.update(dict.fromkeys(faq_edit_log_offsets, position))
+
+def compact_faq_index(language):
+    """Refit one language's index over its live entries, recomputing IDF"""
+    global faq_indexes, language_profiles
+    with faq_index_lock:
+        if not faq_indexes[language].pending_changes:
+            return False
+        faq_by_language = multilingual_faq
+        update_log = faq_update_logs[language]
+        replay_from = len(update_log)
+
+    # Fitting is the slow part, so edits keep landing while it runs
+    started = time.perf_counter()
+    compacted = build_faq_index(language, faq_by_language[language])
+    profiles = build_language_profiles(faq_by_language)
+
+    with faq_index_lock:
+        if faq_update_logs[language] is not update_log:
+            return False  # a reload from disk replaced the index meanwhile
+        for update in update_log[replay_from:]:
+            compacted = apply_faq_update(compacted, update, multilingual_faq[language])
+        faq_update_logs[language] = []
+        faq_indexes = MappingProxyType(dict(faq_indexes, **{language: compacted}))
+        language_profiles = profiles
+        faq_index_info.update({
+            'version': faq_index_info['version'] + 1,
+            'build_seconds': time.perf_counter() - started,
+            'built_at': datetime.now(pytz.utc).isoformat()
+        })
+    return True
+
+# Answer cache bounds: repeat questions skip the FAQ search entirely
+ANSWER_CACHE_SIZE = 1024
+ANSWER_CACHE_TTL = 300  # seconds
+
+class AnswerCache:
+    """Thread-safe LRU cache of chat replies keyed on (language, preprocessed text)"""
+
+    def __init__(self, max_size=ANSWER_CACHE_SIZE, ttl=ANSWER_CACHE_TTL):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, index):
+        """Return a cached reply, or None if missing, expired or built from an older index"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, entry_index, reply = entry
+                if expires_at > time.monotonic() and entry_index is index:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(reply)
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, index, reply):
+        """Store a reply computed against the given FAQ index"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, index, dict(reply))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every cached reply"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Counters reported on /health"""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'ttl_seconds': self.ttl
+            }
+
+answer_cache = AnswerCache()
+
+# Fallback replies, per language: topic -> suggestion, checked in this order
+FALLBACK_TOPICS = {
+    'en': {
+        'symptoms': 'You asked about symptoms. Try asking about specific conditions like "COVID-19 symptoms" or "diabetes symptoms".',
+        'pain': 'For pain-related questions, you might want to ask about specific areas or conditions.',
+        'medication': 'For medication questions, consult with a healthcare provider or pharmacist.',
+        'emergency': 'For medical emergencies, call 911 immediately.',
+        'doctor': 'To find or book appointments with doctors, try asking "How can I book an appointment with a doctor?"',
+        'insurance': 'For health insurance questions, try asking "How do I apply for health insurance?"',
+        'blood': 'For blood-related questions, try asking about "normal blood pressure range" or similar.',
+        'heart': 'For heart-related concerns, try asking "What to do in case of a heart attack?" or consult a cardiologist.',
+        'mental': 'For mental health support, try asking "How can I improve my mental health?" or contact a mental health professional.'
+    },
+    'es': {
+        'síntomas': 'Preguntaste sobre síntomas. Intenta preguntar sobre condiciones específicas como "síntomas de COVID-19" o "síntomas de diabetes".',
+        'dolor': 'Para preguntas sobre dolor, podrías preguntar sobre áreas específicas o condiciones.',
+        'medicamento': 'Para preguntas sobre medicamentos, consulta con un proveedor de atención médica o farmacéutico.',
+        'emergencia': 'Para emergencias médicas, llama al 911 inmediatamente.',
+        'doctor': 'Para encontrar o reservar citas con doctores, intenta preguntar "¿Cómo puedo reservar una cita con un doctor?"',
+        'seguro': 'Para preguntas sobre seguro de salud, intenta preguntar "¿Cómo solicito seguro de salud?"',
+        'sangre': 'Para preguntas sobre sangre, intenta preguntar sobre "rango normal de presión arterial" o similar.',
+        'corazón': 'Para preocupaciones del corazón, intenta preguntar "¿Qué hacer en caso de un ataque cardíaco?" o consulta a un cardiólogo.',
+        'mental': 'Para apoyo de salud mental, intenta preguntar "¿Cómo puedo mejorar mi salud mental?" o contacta a un profesional de salud mental.'
+    },
+    'hi': {
+        'लक्षण': 'आपने लक्षणों के बारे में पूछा। विशिष्ट स्थितियों के बारे में पूछने की कोशिश करें जैसे "कोविड-19 के लक्षण" या "मधुमेह के लक्षण"।',
+        'दर्द': 'दर्द संबंधी प्रश्नों के लिए, आप विशिष्ट क्षेत्रों या स्थितियों के बारे में पूछ सकते हैं।',
+        'दवा': 'दवा के प्रश्नों के लिए, स्वास्थ्य प्रदाता या फार्मासिस्ट से सलाह लें।',
+        'आपातकाल': 'चिकित्सा आपातकाल के लिए, तुरंत 102 पर कॉल करें।',
+        'डॉक्टर': 'डॉक्टरों के साथ अपॉइंटमेंट बुक करने के लिए, "मैं डॉक्टर के साथ अपॉइंटमेंट कैसे बुक करूं?" पूछने की कोशिश करें।',
+        'बीमा': 'स्वास्थ्य बीमा प्रश्नों के लिए, "मैं स्वास्थ्य बीमा के लिए आवेदन कैसे करूं?" पूछने की कोशिश करें।',
+        'रक्त': 'रक्त संबंधी प्रश्नों के लिए, "सामान्य रक्तचाप की सीमा" या इसी तरह के बारे में पूछने की कोशिश करें।',
+        'दिल': 'हृदय संबंधी चिंताओं के लिए, "दिल का दौरा पड़ने पर क्या करना चाहिए?" पूछने की कोशिश करें या हृदय रोग विशेषज्ञ से सलाह लें।',
+        'मानसिक': 'मानसिक स्वास्थ्य सहायता के लिए, "मैं अपना मानसिक स्वास्थ्य कैसे सुधारूं?" पूछने की कोशिश करें या मानसिक स्वास्थ्य पेशेवर से संपर्क करें।'
+    }
+}
+
+FALLBACK_BASE_RESPONSES = {
+    'en': "I couldn't find a specific answer to your question in my healthcare database. ",
+    'es': "No pude encontrar una respuesta específica a tu pregunta en mi base de datos de atención médica. ",
+    'hi': "मुझे अपने स्वास्थ्य डेटाबेस में आपके प्रश्न का विशिष्ट उत्तर नहीं मिला। "
+}
+
+# Shown when no topic matches
+FALLBACK_TOPIC_LISTS = {
+    'en': (
+        "Here are some topics I can help with:\n\n"
+        "• COVID-19 symptoms and information\n"
+        "• Blood pressure and vital signs\n"
+        "• Booking doctor appointments\n"
+        "• Health insurance applications\n"
+        "• Emergency procedures\n"
+        "• Mental health tips\n"
+        "• General health checkup information\n\n"
+        "Please ask about any of these topics, or consult with a healthcare professional for personalized medical advice."
+    ),
+    'es': (
+        "Aquí hay algunos temas con los que puedo ayudar:\n\n"
+        "• Síntomas e información de COVID-19\n"
+        "• Presión arterial y signos vitales\n"
+        "• Reservar citas médicas\n"
+        "• Aplicaciones de seguro de salud\n"
+        "• Procedimientos de emergencia\n"
+        "• Consejos de salud mental\n"
+        "• Información general de chequeos médicos\n\n"
+        "Por favor pregunta sobre cualquiera de estos temas, o consulta con un profesional de la salud para consejos médicos personalizados."
+    ),
+    'hi': (
+        "यहाँ कुछ विषय हैं जिनमें मैं मदद कर सकता हूँ:\n\n"
+        "• कोविड-19 के लक्षण और जानकारी\n"
+        "• रक्तचाप और महत्वपूर्ण संकेत\n"
+        "• डॉक्टर की अपॉइंटमेंट बुकिंग\n"
+        "• स्वास्थ्य बीमा आवेदन\n"
+        "• आपातकालीन प्रक्रियाएं\n"
+        "• मानसिक स्वास्थ्य टिप्स\n"
+        "• सामान्य स्वास्थ्य जांच की जानकारी\n\n"
+        "कृपया इनमें से किसी भी विषय के बारे में पूछें, या व्यक्तिगत चिकित्सा सलाह के लिए स्वास्थ्य पेशेवर से सलाह लें।"
+    )
+}
+
+# Appended after a topic suggestion
+FALLBACK_DISCLAIMERS = {
+    'en': "\n\nFor specific medical concerns, please consult with a qualified healthcare professional.",
+    'es': "\n\nPara preocupaciones médicas específicas, por favor consulta con un profesional de la salud calificado.",
+    'hi': "\n\nविशिष्ट चिकित्सा चिंताओं के लिए, कृपया किसी योग्य स्वास्थ्य पेशेवर से सलाह लें।"
+}
+
+class TopicMatcher:
+    """Finds the first fallback topic related to a keyword, compiled once per language
+
+    A keyword and a topic are related when either contains the other. Topics inside
+    the keyword are found with an Aho-Corasick scan over its characters, and keywords
+    inside a topic are looked up in a table of every topic substring. The topic listed
+    first wins, as it did in the original nested scan.
+    """
+
+    def __init__(self, topics):
+        # Keyword contained in a topic: every substring -> first topic containing it
+        self._substring_ranks = {}
+        for rank, topic in enumerate(topics):
+            for start in range(len(topic)):
+                for end in range(start + 1, len(topic) + 1):
+                    self._substring_ranks.setdefault(topic[start:end], rank)
+
+        # Topic contained in a keyword: Aho-Corasick automaton over the topics
+        self._transitions = [{}]
+        self._fail = [0]
+        self._ranks = [None]  # first topic ending at each state
+        for rank, topic in enumerate(topics):
+            state = 0
+            for char in topic:
+                if char not in self._transitions[state]:
+                    self._transitions.append({})
+                    self._fail.append(0)
+                    self._ranks.append(None)
+                    self._transitions[state][char] = len(self._transitions) - 1
+                state = self._transitions[state][char]
+            if self._ranks[state] is None:
+                self._ranks[state] = rank
+
+        queue = deque(self._transitions[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._transitions[state].items():
+                fail = self._fail[state]
+                while fail and char not in self._transitions[fail]:
+                    fail = self._fail[fail]
+                self._fail[next_state] = self._transitions[fail].get(char, 0)
+                inherited = self._ranks[self._fail[next_state]]
+                if inherited is not None and (self._ranks[next_state] is None or inherited < self._ranks[next_state]):
+                    self._ranks[next_state] = inherited
+                queue.append(next_state)
+
+    def match(self, keyword):
+        """Position of the first topic related to the keyword, or None"""
+        best = self._substring_ranks.get(keyword)
+        state = 0
+        for char in keyword:
+            while state and char not in self._transitions[state]:
+                state = self._fail[state]
+            state = self._transitions[state].get(char, 0)
+            rank = self._ranks[state]
+            if rank is not None and (best is None or rank < best):
+                best = rank
+        return best
+
+fallback_topic_matchers = {
+    language: TopicMatcher(list(topics)) for language, topics in FALLBACK_TOPICS.items()
+}
+
+# Complete replies, so a fallback is a lookup rather than string building
+fallback_topic_responses = {
+    language: tuple(
+        FALLBACK_BASE_RESPONSES[language] + " " + suggestion + FALLBACK_DISCLAIMERS[language]
+        for suggestion in topics.values()
+    )
+    for language, topics in FALLBACK_TOPICS.items()
+}
+fallback_general_responses = {
+    language: FALLBACK_BASE_RESPONSES[language] + FALLBACK_TOPIC_LISTS[language]
+    for language in FALLBACK_TOPICS
+}
+
+def generate_fallback_response(user_input, language='en', analysis=None):
+    """Generate helpful fallback response for unmatched queries with bilingual support"""
+    if analysis is None:
+        analysis = analyze_text(user_input, language)
+    if language not in FALLBACK_TOPICS:
+        language = 'en'
+
+    matcher = fallback_topic_matchers[language]
+    for keyword in analysis.keywords:
+        rank = matcher.match(keyword)
+        if rank is not None:
+            return fallback_topic_responses[language][rank]
+    return fallback_general_responses[language]
+
+@app.before_request
+def start_worker_threads():
+    # Started on the first request so every forked worker gets its own threads
+    start_faq_threads()
+    start_metrics_flusher()
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+# Words per chunk when streaming an answer over server-sent events
+STREAM_CHUNK_WORDS = 8
+
+def analyze_and_reply(user_input, preferred_language=None):
+    """Parse the message once, detect its language and build the reply"""
+    analysis = analyze_text(user_input, preferred_language=preferred_language)
+    return analysis, build_chat_reply(user_input, analysis)
+
+def handle_chat_message(user_input):
+    """Answer a message for the current session, recording history and metrics"""
+    user_id = get_or_create_session()
+    started = time.perf_counter()
+    timings = {}
+    timings_token = stage_timings.set(timings)
+    # The session's language (picked through /language, or detected last time)
+    # is kept unless detection is confident
+    preferred_language = session.get('language')
+    try:
+        # Analysis and scoring are CPU-bound and hold the GIL, so they run on the
+        # request thread; gunicorn worker processes are what scale them out
+        analysis, reply = analyze_and_reply(user_input, preferred_language)
+        detected_language = analysis.language
+        if not session.get('language_explicit'):
+            session['language'] = detected_language
+
+        if reply['status'] != 'empty_input':
+            # Save to chat history
+            with timed_stage('save_history'):
+                save_message_to_history(user_id, user_input, reply['response'], detected_language)
+    finally:
+        stage_timings.reset(timings_token)
+
+    duration = time.perf_counter() - started
+    record_chat_metrics(reply, timings, duration)
+    return reply, timings, duration
+
+def add_debug_timing(response, timings, duration):
+    """Attach the per-stage breakdown when the client sent X-Debug-Timing"""
+    if request.headers.get('X-Debug-Timing'):
+        # Server-Timing style breakdown in milliseconds
+        stages = [f'{stage};dur={seconds * 1000:.3f}' for stage, seconds in timings.items()]
+        response.headers['X-Debug-Timing'] = ', '.join(stages + [f'total;dur={duration * 1000:.3f}'])
+    return response
+
 @app.route('/chat', methods=['POST'])
 def chat():
     user_input = request.json.get('message', '').strip()
-    user_id = get_or_create_session()
-    
-    # Detect language
-    detected_language = detect_language(user_input)
-    session['language'] = detected_language
+    reply, timings, duration = handle_chat_message(user_input)
+    return add_debug_timing(jsonify(reply), timings, duration)
+
+def server_sent_event(event, data):
+    """Format one SSE message with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def stream_chat_reply(reply):
+    """Send the match metadata first, then the answer text a few words at a time"""
+    yield server_sent_event('meta', {key: value for key, value in reply.items() if key != 'response'})
+    words = re.findall(r'\S+\s*', reply['response'])
+    for start in range(0, len(words), STREAM_CHUNK_WORDS):
+        yield server_sent_event('delta', {'text': ''.join(words[start:start + STREAM_CHUNK_WORDS])})
+    yield server_sent_event('done', {})
+
+@app.route('/chat/stream', methods=['POST'])
+def chat_stream():
+    """Same as /chat, but the reply is sent as server-sent events
+
+    The answer is computed in full before the first event, and a sync worker
+    is held until the client has read the whole stream. The web UI therefore
+    uses /chat, and the response stays buffered by a reverse proxy such as
+    nginx, which is what shields sync workers from slow clients.
+    """
+    user_input = request.json.get('message', '').strip()
+    # Session and history are settled before streaming starts, since the
+    # session cookie can't change once the response headers are sent
+    reply, timings, duration = handle_chat_message(user_input)
+    response = Response(stream_chat_reply(reply), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    return add_debug_timing(response, timings, duration)
+
+def build_chat_reply(user_input, analysis, match=None):
+    """Build the /chat payload for an analysed message, searching the FAQ unless a match is given"""
+    detected_language = analysis.language
 
     if not user_input:
-        empty_response = {
-            'en': f'Please ask me a question about healthcare! I\'m {CHATBOT_NAME}, here to help.',
-            'es': f'¡Por favor hazme una pregunta sobre atención médica! Soy {CHATBOT_NAME}, aquí para ayudar.',
-            'hi': f'कृपया मुझसे स्वास्थ्य के बारे में कोई प्रश्न पूछें! मैं {CHATBOT_NAME} हूं, यहाँ मदद के लिए।'
-        }
-        return jsonify({
-            'response': empty_response[detected_language],
+        return {
+            'response': EMPTY_INPUT_RESPONSES[detected_language],
             'confidence': 0,
             'status': 'empty_input',
             'language': detected_language,
             'chatbot_name': CHATBOT_NAME
-        })
+        }
 
     # Handle special commands
-    if user_input.lower() in ['what can i call you', 'what is your name', 'who are you', '¿cómo te llamas?', '¿quién eres?', 'आपका नाम क्या है', 'आप कौन हैं', 'मैं आपको क्या कह सकता हूं']:
-        name_response = {
-            'en': f'You can call me {CHATBOT_NAME}! I\'m your AI healthcare assistant. I\'m here to help you with medical questions, health information, and general wellness guidance. Feel free to ask me anything about healthcare!',
-            'es': f'¡Puedes llamarme {CHATBOT_NAME}! Soy tu asistente de salud con IA. Estoy aquí para ayudarte con preguntas médicas, información de salud y orientación general de bienestar. ¡Siéntete libre de preguntarme cualquier cosa sobre atención médica!',
-            'hi': f'आप मुझे {CHATBOT_NAME} कह सकते हैं! मैं आपका AI स्वास्थ्य सहायक हूं। मैं यहाँ आपकी चिकित्सा प्रश्नों, स्वास्थ्य जानकारी और सामान्य कल्याण मार्गदर्शन में मदद के लिए हूं। स्वास्थ्य के बारे में मुझसे कुछ भी पूछने में संकोच न करें!'
-        }
-        response = name_response[detected_language]
-        save_message_to_history(user_id, user_input, response, detected_language)
-        return jsonify({
-            'response': response,
+    if is_identity_question(user_input):
+        return {
+            'response': IDENTITY_RESPONSES[detected_language],
             'confidence': 100,
             'status': 'identity',
             'language': detected_language,
             'chatbot_name': CHATBOT_NAME
-        })
+        }
 
-    # Enhanced similarity search with language support
-    global faq_data, faq_questions, faq_answers, vectorizer, tfidf_matrix
-    
-    # Switch to appropriate language data
-    if detected_language == 'es' and multilingual_faq['es']:
-        faq_data = multilingual_faq['es']
-        faq_questions = [item['question'] for item in faq_data]
-        faq_answers = [item['answer'] for item in faq_data]
-        vectorizer = setup_language_vectorizer('es')
-        if faq_questions:
-            processed_questions = [preprocess_text(q) for q in faq_questions]
-            tfidf_matrix = vectorizer.fit_transform(processed_questions)
-    elif detected_language == 'hi' and multilingual_faq['hi']:
-        faq_data = multilingual_faq['hi']
-        faq_questions = [item['question'] for item in faq_data]
-        faq_answers = [item['answer'] for item in faq_data]
-        vectorizer = setup_language_vectorizer('hi')
-        if faq_questions:
-            processed_questions = [preprocess_text(q) for q in faq_questions]
-            tfidf_matrix = vectorizer.fit_transform(processed_questions)
-    else:
-        faq_data = multilingual_faq['en']
-        faq_questions = [item['question'] for item in faq_data]
-        faq_answers = [item['answer'] for item in faq_data]
+    # Repeat questions are answered from the cache while the FAQ index is unchanged
+    cache_key = None
+    if match is None:
+        index = get_faq_index(detected_language)
+        # Every score (dense included) depends only on the preprocessed text
+        cache_key = (detected_language, analysis.processed_text)
+        cached_reply = answer_cache.get(cache_key, index)
+        if cached_reply is not None:
+            return cached_reply
 
-    answer, similarity, confidence_info = enhanced_similarity_search(user_input)
+    # Enhanced similarity search against the detected language's index
+    if match is None:
+        match = search_faq(user_input, language=detected_language, analysis=analysis)
+    answer, similarity, confidence_info, _ = match
 
     if answer:
         response = answer
         status = 'matched'
     else:
-        response = generate_fallback_response(user_input, detected_language)
+        with timed_stage('generate_fallback_response'):
+            response = generate_fallback_response(user_input, detected_language, analysis=analysis)
         status = 'fallback'
 
-    # Save to chat history
-    save_message_to_history(user_id, user_input, response, detected_language)
-
-    return jsonify({
+    reply = {
         'response': response,
         'confidence': float(similarity * 100),
         'status': status,
         'debug_info': confidence_info,
+        'suggestions': clarification_suggestions(match),
         'language': detected_language,
         'chatbot_name': CHATBOT_NAME
+    }
+    if cache_key is not None:
+        answer_cache.put(cache_key, index, reply)
+    return reply
+
+def is_identity_question(user_input):
+    """Check whether the user is asking for the chatbot's name"""
+    return user_input.lower() in IDENTITY_QUESTIONS
+
+def batch_chat_replies(messages, batch_size=64):
+    """Answer many messages at once, scoring each language group a chunk of rows at a time"""
+    messages = [message.strip() for message in messages]
+    analyses = analyze_texts(messages, batch_size=batch_size)
+
+    # Group the messages that need an FAQ search by their detected language
+    positions_by_language = {}
+    for position, analysis in enumerate(analyses):
+        if analysis.text and not is_identity_question(analysis.text):
+            positions_by_language.setdefault(analysis.language, []).append(position)
+
+    matches = {}
+    for language, positions in positions_by_language.items():
+        index = get_faq_index(language)
+        if index.vectorizer is None:
+            for position in positions:
+                matches[position] = SearchResult(None, 0, "No FAQ data available", ())
+            continue
+        # Chunks keep the dense messages x FAQ score matrices to batch_size rows
+        for start in range(0, len(positions), batch_size):
+            chunk = positions[start:start + batch_size]
+            combined_scores = score_faq_matches(index, [analyses[position] for position in chunk])
+            for position, scores in zip(chunk, combined_scores):
+                matches[position] = best_faq_match(index, scores)
+
+    return [
+        build_chat_reply(message, analysis, matches.get(position))
+        for position, (message, analysis) in enumerate(zip(messages, analyses))
+    ]
+
+# Larger jobs are split into several /chat/batch requests
+MAX_BATCH_MESSAGES = 10000
+
+@app.route('/chat/batch', methods=['POST'])
+def chat_batch():
+    """Answer a list of messages in one request (no chat history is recorded)"""
+    messages = request.json.get('messages')
+    if not isinstance(messages, list) or not all(isinstance(message, str) for message in messages):
+        return jsonify({'status': 'error', 'message': 'messages must be a list of strings'}), 400
+    if len(messages) > MAX_BATCH_MESSAGES:
+        return jsonify({'status': 'error', 'message': f'At most {MAX_BATCH_MESSAGES} messages per request'}), 413
+
+    results = batch_chat_replies(messages)
+    return jsonify({
+        'results': results,
+        'total': len(results),
+        'chatbot_name': CHATBOT_NAME
     })
 
 @app.route('/chat/history')
@@ -425,8 +2038,7 @@ def get_chat_history_route():
 def clear_chat_history():
     """Clear chat history for current session"""
     user_id = get_or_create_session()
-    if user_id in chat_histories:
-        chat_histories[user_id] = []
+    history_store.clear(user_id)
     
     clear_response = {
         'en': f'Chat history cleared! I\'m {CHATBOT_NAME}, ready to help you with healthcare questions.',
@@ -447,6 +2059,7 @@ def set_language():
     language = request.json.get('language', 'en')
     if language in ['en', 'es', 'hi']:
         session['language'] = language
+        session['language_explicit'] = True
         return jsonify({
             'status': 'success',
             'language': language,
@@ -454,6 +2067,82 @@ def set_language():
         })
     return jsonify({'status': 'error', 'message': 'Unsupported language'})
 
+# Admin endpoints are disabled unless ADMIN_TOKEN is set
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+def is_admin_request():
+    """Check the X-Admin-Token header against ADMIN_TOKEN"""
+    token = request.headers.get('X-Admin-Token', '')
+    return bool(ADMIN_TOKEN) and hmac.compare_digest(token, ADMIN_TOKEN)
+
+@app.route('/admin/reload', methods=['POST'])
+def reload_faq():
+    """Rebuild the FAQ indexes from disk in the background"""
+    if not is_admin_request():
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+
+    languages = (request.get_json(silent=True) or {}).get('languages') or list(FAQ_FILES)
+    if not isinstance(languages, list) or any(language not in FAQ_FILES for language in languages):
+        return jsonify({'status': 'error', 'message': 'Unsupported language'}), 400
+
+    rebuild_faq_indexes_in_background(languages)
+    return jsonify({
+        'status': 'reloading',
+        'languages': languages,
+        'index_version': faq_index_info['version']
+    }), 202
+
+def faq_entry_changes(data, required):
+    """Validate question/answer fields from an admin request body (None if invalid)"""
+    changes = {field: data[field] for field in ('question', 'answer') if field in data}
+    if any(not isinstance(value, str) or not value.strip() for value in changes.values()):
+        return None
+    if not changes or (required and len(changes) < 2):
+        return None
+    return {field: value.strip() for field, value in changes.items()}
+
+@app.route('/admin/faq/<language>', methods=['POST'])
+def add_faq_entry(language):
+    """Add one FAQ entry, searchable as soon as this returns"""
+    if not is_admin_request():
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+    if language not in FAQ_FILES:
+        return jsonify({'status': 'error', 'message': 'Unsupported language'}), 400
+
+    changes = faq_entry_changes(request.get_json(silent=True) or {}, required=True)
+    if changes is None:
+        return jsonify({'status': 'error', 'message': 'A question and an answer are required'}), 400
+
+    entry = update_faq_entry(language, changes=changes)
+    return jsonify({'status': 'success', 'entry': entry, 'index_version': faq_index_info['version']}), 201
+
+@app.route('/admin/faq/<language>/<int:entry_id>', methods=['PATCH', 'DELETE'])
+def edit_faq_entry(language, entry_id):
+    """Patch or remove one FAQ entry by id"""
+    if not is_admin_request():
+        return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
+    if language not in FAQ_FILES:
+        return jsonify({'status': 'error', 'message': 'Unsupported language'}), 400
+
+    changes = None
+    if request.method == 'PATCH':
+        changes = faq_entry_changes(request.get_json(silent=True) or {}, required=False)
+        if changes is None:
+            return jsonify({'status': 'error', 'message': 'Provide a question and/or an answer'}), 400
+
+    entry = update_faq_entry(language, entry_id, changes)
+    if entry is None:
+        return jsonify({'status': 'error', 'message': 'FAQ entry not found'}), 404
+    return jsonify({'status': 'success', 'entry': entry, 'index_version': faq_index_info['version']})
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus metrics for this worker process, or all workers when METRICS_DIR is set"""
+    lines = []
+    for metric in collect_metrics():
+        lines.extend(metric.render())
+    return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
 @app.route('/health')
 def health_check():
     """Health check endpoint for monitoring"""
@@ -464,8 +2153,33 @@ def health_check():
         'version': '3.0',
         'features': ['chat_history', 'bilingual_support', 'personality'],
         'chatbot_name': CHATBOT_NAME,
-        'supported_languages': ['en', 'es', 'hi']
+        'supported_languages': ['en', 'es', 'hi'],
+        'answer_cache': answer_cache.stats(),
+        'dense_retrieval': sorted(language for language, index in faq_indexes.items() if index.dense_index is not None),
+        'index_version': faq_index_info['version'],
+        'index_build_seconds': round(faq_index_info['build_seconds'], 4),
+        'index_built_at': faq_index_info['built_at'],
+        'index_last_error': faq_index_info['last_error'],
+        'index_pending_changes': {language: index.pending_changes for language, index in faq_indexes.items()}
     })
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='Healthcare FAQ chatbot')
+    subcommands = parser.add_subparsers(dest='command')
+    build_index_parser = subcommands.add_parser('build-index', help='write prebuilt FAQ index artifacts')
+    build_index_parser.add_argument('--output', default=FAQ_INDEX_DIR or 'faq_index', help='artifact directory')
+    args = parser.parse_args()
+
+    if args.command == 'build-index':
+        faq_by_language = load_faq_data()
+        version_dir = save_faq_indexes(
+            build_faq_indexes(faq_by_language), args.output, build_language_profiles(faq_by_language)
+        )
+        print(f"FAQ index artifacts written to {version_dir}")
+    else:
+        # Development server; use `gunicorn -c gunicorn.conf.py` in production
+        app.run(
+            host=os.environ.get('HOST', '0.0.0.0'),
+            port=int(os.environ.get('PORT', 5000)),
+            debug=os.environ.get('FLASK_DEBUG', '0') == '1'
+        )
\ No newline at end of file
@@ -0,0 +1,341 @@
+import argparse
+import cProfile
+import io
+import json
+import platform
+import pstats
+import random
+import resource
+import threading
+import time
+import tracemalloc
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pytz
+import requests
+
+# main (spaCy and the FAQ indexes) is imported only by the in-process paths,
+# so replaying against a server with --url stays light
+
+def load_traffic(path, limit=None):
+    """Read {"message", "language", "session"} records from a JSONL file"""
+    records = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if not isinstance(record.get('message'), str):
+                raise ValueError(f"{path}:{line_number}: record has no message")
+            records.append({
+                'message': record['message'],
+                'language': record.get('language'),
+                'session': str(record.get('session') or f'anonymous-{line_number}')
+            })
+            if limit and len(records) >= limit:
+                break
+    return records
+
+def generate_traffic(faq_by_language, count, sessions, rng):
+    """Synthetic traffic: FAQ paraphrases plus the odd greeting, spread over sessions"""
+    from benchmark import paraphrase
+    greetings = {'en': ['hello', 'thanks', 'who are you?'], 'es': ['hola', 'gracias'], 'hi': ['नमस्ते', 'धन्यवाद']}
+    languages = [language for language, items in faq_by_language.items() if items]
+    records = []
+    for _ in range(count):
+        language = rng.choice(languages)
+        if rng.random() < 0.1:
+            message = rng.choice(greetings.get(language, greetings['en']))
+        else:
+            message = paraphrase(rng.choice(faq_by_language[language])['question'], rng)
+        records.append({'message': message, 'language': language, 'session': f'session-{rng.randrange(sessions)}'})
+    return records
+
+class ReplayTarget:
+    """Sends each session's requests through its own client, so cookies (and the chat session) persist"""
+
+    def __init__(self, set_language=False):
+        self.set_language = set_language
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    def new_client(self):
+        raise NotImplementedError
+
+    def post(self, client, path, payload):
+        """POST JSON and return (status code, body bytes)"""
+        raise NotImplementedError
+
+    def faq_summary(self):
+        """The FAQ being served, for the report"""
+        raise NotImplementedError
+
+    def send(self, record, endpoint):
+        """Returns (status code, body, seconds spent waiting on the session's earlier request)"""
+        with self.lock:
+            if record['session'] not in self.clients:
+                self.clients[record['session']] = (self.new_client(), threading.Lock(), [False])
+            client, client_lock, language_set = self.clients[record['session']]
+        # Requests from one session are serialised, as a browser would send them
+        waiting = time.perf_counter()
+        with client_lock:
+            session_wait = time.perf_counter() - waiting
+            if self.set_language and record['language'] and not language_set[0]:
+                self.post(client, '/language', {'language': record['language']})
+                language_set[0] = True
+            status_code, body = self.post(client, endpoint, {'message': record['message']})
+        return status_code, body, session_wait
+
+class TestClientTarget(ReplayTarget):
+    """The app in-process through Flask test clients"""
+
+    def __init__(self, set_language=False):
+        super().__init__(set_language)
+        import main
+        self.app = main.app
+
+    def new_client(self):
+        return self.app.test_client()
+
+    def faq_summary(self):
+        import main
+        return {
+            'faq_count': {language: len(items) for language, items in main.multilingual_faq.items()},
+            'index_version': main.faq_index_info['version']
+        }
+
+    def post(self, client, path, payload):
+        response = client.post(path, json=payload)
+        return response.status_code, response.get_data()
+
+class HttpTarget(ReplayTarget):
+    """A running server, e.g. gunicorn, through requests sessions"""
+
+    def __init__(self, base_url, set_language=False, timeout=30):
+        super().__init__(set_language)
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+
+    def new_client(self):
+        return requests.Session()
+
+    def faq_summary(self):
+        """What the server under test reports about its FAQ on /health"""
+        try:
+            health = requests.get(f'{self.base_url}/health', timeout=self.timeout).json()
+        except (requests.RequestException, ValueError) as e:
+            return {'error': str(e)}
+        return {key: health.get(key) for key in ('faq_count', 'index_version', 'nlp_model')}
+
+    def post(self, client, path, payload):
+        response = client.post(f'{self.base_url}{path}', json=payload, timeout=self.timeout)
+        return response.status_code, response.content
+
+def reply_status(endpoint, body):
+    """The chatbot's own status field (success, fallback, ...) from a reply body"""
+    try:
+        if endpoint == '/chat/stream':
+            # The first server-sent event carries the reply metadata
+            meta = body.decode('utf-8').split('\n\n', 1)[0]
+            return json.loads(meta.split('data: ', 1)[1]).get('status')
+        return json.loads(body).get('status')
+    except (ValueError, IndexError, AttributeError):
+        return None
+
+# One replayed request; latency runs from its scheduled send time when paced
+ReplayResult = namedtuple('ReplayResult', ['status_code', 'reply_status', 'latency', 'session_wait'])
+
+def replay(target, records, endpoint='/chat', concurrency=4, qps=0):
+    """Send every record, paced at `qps` (0 = as fast as the workers allow)"""
+    results = [None] * len(records)
+
+    def send(position, record, scheduled):
+        # Unpaced, each worker sends as soon as it is free, so latency starts there
+        started = scheduled if scheduled is not None else time.perf_counter()
+        try:
+            status_code, body, session_wait = target.send(record, endpoint)
+            status = reply_status(endpoint, body)
+        except Exception as e:  # a replay should report failures, not stop on them
+            status_code, status, session_wait = type(e).__name__, None, 0.0
+        results[position] = ReplayResult(status_code, status, time.perf_counter() - started, session_wait)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for position, record in enumerate(records):
+            scheduled = None
+            if qps > 0:
+                # Open-loop pacing: request i is due at i / qps regardless of earlier replies,
+                # and time it then spends queued for a free worker counts towards its latency
+                scheduled = started + position / qps
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            executor.submit(send, position, record, scheduled)
+    elapsed = time.perf_counter() - started
+    return results, elapsed
+
+def latency_summary(latencies):
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        'mean': round(float(latencies_ms.mean()), 3),
+        'p50': round(float(np.percentile(latencies_ms, 50)), 3),
+        'p90': round(float(np.percentile(latencies_ms, 90)), 3),
+        'p95': round(float(np.percentile(latencies_ms, 95)), 3),
+        'p99': round(float(np.percentile(latencies_ms, 99)), 3),
+        'max': round(float(latencies_ms.max()), 3)
+    }
+
+def summarize(records, results, elapsed, concurrency, qps):
+    """Throughput, latency percentiles, error rate and status mix for one replay"""
+    status_mix = Counter(str(result.status_code) for result in results)
+    errors = sum(count for status, count in status_mix.items() if not status.isdigit() or int(status) >= 400)
+    by_language = {}
+    for record, result in zip(records, results):
+        by_language.setdefault(record['language'] or 'unknown', []).append(result.latency)
+
+    return {
+        'requests': len(results),
+        'sessions': len({record['session'] for record in records}),
+        'concurrency': concurrency,
+        'target_qps': qps or None,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput_qps': round(len(results) / elapsed, 2),
+        'latency_from': 'scheduled_send' if qps else 'send',
+        'latency_ms': latency_summary([result.latency for result in results]),
+        # Included in latency: a session's requests wait for its previous reply
+        'session_wait_ms': latency_summary([result.session_wait for result in results]),
+        'error_rate': round(errors / len(results), 4),
+        'status_mix': dict(status_mix.most_common()),
+        'reply_status_mix': dict(Counter(str(result.reply_status) for result in results).most_common()),
+        'by_language': {
+            language: {'requests': len(latencies), 'latency_ms': latency_summary(latencies)}
+            for language, latencies in sorted(by_language.items())
+        }
+    }
+
+def profile_rows(stats, sort_key, top):
+    """The top functions of a pstats profile as JSON-friendly rows"""
+    stats.sort_stats(sort_key)
+    rows = []
+    for function in stats.fcn_list[:top]:
+        filename, line, name = function
+        _, calls, total_time, cumulative_time, _ = stats.stats[function]
+        rows.append({
+            'function': f'{filename}:{line}({name})',
+            'calls': calls,
+            'total_ms': round(total_time * 1000, 3),
+            'cumulative_ms': round(cumulative_time * 1000, 3)
+        })
+    return rows
+
+def profile_hot_path(records, endpoint, profile_output=None, memory=False, top=20):
+    """Profile a sequential pass of /chat requests with cProfile and, optionally, tracemalloc
+
+    Requests are answered on the calling thread, so one profiler sees all of each request.
+    """
+    import main
+    target = TestClientTarget()
+    # Start cold so the profile shows the search path, not answer cache hits
+    main.answer_cache.clear()
+    profiler = cProfile.Profile()
+    if memory:
+        tracemalloc.start()
+        baseline = tracemalloc.take_snapshot()
+    try:
+        profiler.enable()
+        for record in records:
+            target.send(record, endpoint)
+        profiler.disable()
+        if memory:
+            snapshot = tracemalloc.take_snapshot()
+            current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if memory:
+            tracemalloc.stop()
+
+    stats = pstats.Stats(profiler, stream=io.StringIO())
+    if profile_output:
+        stats.dump_stats(profile_output)
+    report = {
+        'requests': len(records),
+        # Cumulative time shows which stages dominate; self time shows where the CPU actually goes
+        'top_cumulative': profile_rows(stats, 'cumulative', top),
+        'top_self': profile_rows(stats, 'tottime', top)
+    }
+    if memory:
+        report['memory'] = {
+            'traced_current_mb': round(current / 2**20, 3),
+            'traced_peak_mb': round(peak / 2**20, 3),
+            'top_growth': [
+                {'location': str(stat.traceback[0]), 'size_kb': round(stat.size_diff / 1024, 1), 'count': stat.count_diff}
+                for stat in snapshot.compare_to(baseline, 'lineno')[:top]
+            ]
+        }
+        if profile_output:
+            snapshot.dump(profile_output + '.tracemalloc')
+    return report
+
+def main_cli():
+    parser = argparse.ArgumentParser(description='Replay recorded chat traffic against the chatbot')
+    parser.add_argument('traffic', help='JSONL file of {"message", "language", "session"} records')
+    parser.add_argument('--generate', type=int, metavar='COUNT',
+                        help='write COUNT synthetic records to the traffic file and exit')
+    parser.add_argument('--url', help='base URL of a running server (default: in-process test client)')
+    parser.add_argument('--endpoint', default='/chat', choices=['/chat', '/chat/stream'])
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--qps', type=float, default=0, help='target requests per second (0 = unpaced)')
+    parser.add_argument('--limit', type=int, help='replay at most this many records')
+    parser.add_argument('--set-language', action='store_true',
+                        help="pin each session's language through /language before its first message")
+    parser.add_argument('--profile', type=int, default=0, metavar='N',
+                        help='then profile N requests of the hot path in-process')
+    parser.add_argument('--profile-output', help='write pstats (and the tracemalloc snapshot) here')
+    parser.add_argument('--memory', action='store_true', help='take tracemalloc snapshots while profiling')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='write results JSON here as well as stdout')
+    args = parser.parse_args()
+
+    if args.generate:
+        rng = random.Random(args.seed)
+        import main
+        records = generate_traffic(main.load_faq_data(), args.generate, max(1, args.generate // 5), rng)
+        with open(args.traffic, 'w', encoding='utf-8') as f:
+            for record in records:
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"Wrote {len(records)} records to {args.traffic}")
+        return
+    if (args.profile or args.memory) and args.url:
+        parser.error('--profile and --memory run in-process and cannot be combined with --url')
+
+    records = load_traffic(args.traffic, args.limit)
+    if not records:
+        parser.error(f'{args.traffic} has no records (use --generate to create synthetic traffic)')
+
+    target = HttpTarget(args.url, args.set_language) if args.url else TestClientTarget(args.set_language)
+    results, elapsed = replay(target, records, args.endpoint, args.concurrency, args.qps)
+    report = {
+        'created_at': datetime.now(pytz.utc).isoformat(),
+        'python': platform.python_version(),
+        'target': args.url or 'test_client',
+        'endpoint': args.endpoint,
+        'faq': target.faq_summary(),
+        'replay': summarize(records, results, elapsed, args.concurrency, args.qps),
+        # Process-wide high-water mark; only this process's usage with --url
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    }
+    if args.profile or args.memory:
+        report['profile'] = profile_hot_path(
+            records[:args.profile or 200], args.endpoint, args.profile_output, args.memory
+        )
+
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    print(output)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+
+if __name__ == '__main__':
+    main_cli()
@@ -336,13 +336,14 @@ Ask me anything about healthcare! I use advanced natural language processing to
                 document.getElementById('languageSelect').value = data.language;
             }
             
-            // Simulate realistic processing time
-            const processingTime = Math.max(800, Math.min(2000, message.length * 50));
-            await this.delay(processingTime);
-            
             // Hide typing indicator and add bot response
             this.hideTypingIndicator();
-            this.addMessage(data.response, 'bot', data.confidence, data.status);
+            const messageBubble = this.addMessage(data.response, 'bot', data.confidence, data.status);
+            
+            // Offer one-click follow-ups when the match was ambiguous or weak
+            if (data.suggestions && data.suggestions.length) {
+                this.addSuggestions(messageBubble, data.suggestions);
+            }
             
         } catch (error) {
             console.error('Error:', error);
@@ -403,6 +404,38 @@ Ask me anything about healthcare! I use advanced natural language processing to
         setTimeout(() => {
             messageDiv.style.opacity = '1';
         }, 50);
+        
+        return messageBubble;
+    }
+    
+    addSuggestions(messageBubble, suggestions) {
+        const labels = {
+            'en': 'Did you mean:',
+            'es': '¿Quisiste decir:',
+            'hi': 'क्या आपका मतलब था:'
+        };
+        
+        const suggestionsDiv = document.createElement('div');
+        suggestionsDiv.className = 'suggestions';
+        
+        const label = document.createElement('span');
+        label.textContent = labels[this.currentLanguage] || labels['en'];
+        suggestionsDiv.appendChild(label);
+        
+        suggestions.forEach(question => {
+            const button = document.createElement('button');
+            button.className = 'suggestion-btn';
+            button.textContent = question;
+            button.addEventListener('click', () => {
+                if (this.isProcessing) return;
+                this.userInput.value = question;
+                this.sendMessage();
+            });
+            suggestionsDiv.appendChild(button);
+        });
+        
+        messageBubble.parentElement.appendChild(suggestionsDiv);
+        this.scrollToBottom();
     }
     
     formatMessageContent(content) {
@@ -0,0 +1,34 @@
+import main
+
+NEW_ENTRY = {'id': 1000, 'question': 'What is the dosage of amoxicillin for children?', 'answer': 'Amoxicillin dosing.'}
+
+def best_answer(index, query):
+    scores = main.score_faq_matches(index, [main.analyze_text(query, index.language)])[0]
+    return main.best_faq_match(index, scores).answer
+
+def test_added_entry_matches_paraphrases_before_compaction():
+    faq_items = main.load_faq_file(main.FAQ_FILES['en'])
+    index = main.build_faq_index('en', faq_items)
+    updated = main.apply_faq_update(index, main.FaqUpdate(NEW_ENTRY['id'], NEW_ENTRY), faq_items + [NEW_ENTRY])
+
+    for query in ('amoxicillin dose children', 'amoxicillin children'):
+        assert best_answer(updated, query) == NEW_ENTRY['answer']
+    # Existing entries still match, and the index being served is left untouched
+    assert best_answer(updated, faq_items[0]['question']) == faq_items[0]['answer']
+    assert 'amoxicillin' not in index.vectorizer.vocabulary_
+    assert best_answer(index, 'amoxicillin children') is None
+
+def test_terms_dropped_at_fit_get_no_provisional_columns():
+    # 'clinic' is in every question, so max_df leaves it out of the fitted vocabulary
+    faq_items = [
+        {'id': i, 'question': f'Does the clinic treat {condition}?', 'answer': condition}
+        for i, condition in enumerate(['asthma', 'diabetes', 'migraine', 'eczema'])
+    ]
+    index = main.build_faq_index('en', faq_items)
+    entry = {'id': 4, 'question': 'Does the clinic treat zorbitis?', 'answer': 'zorbitis'}
+    updated = main.apply_faq_update(index, main.FaqUpdate(entry['id'], entry), faq_items + [entry])
+
+    assert 'clinic' in index.dropped_terms
+    assert 'clinic' not in updated.vectorizer.vocabulary_
+    assert 'zorbitis' in updated.vectorizer.vocabulary_
+    assert best_answer(updated, 'clinic zorbitis') == 'zorbitis'